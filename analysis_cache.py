@@ -0,0 +1,121 @@
+# analysis_cache.py
+"""
+Content-addressed cache for parse/analysis results.
+Entries are keyed by a hash of the uploaded bytes plus the parser version and a
+fingerprint of the config tables, so a change to either invalidates old results.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from code_tables import get_tables
+from log_parser import PARSER_VERSION, registry_fingerprint
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def config_fingerprint() -> str:
+    return hashlib.blake2b(f"{get_tables().fingerprint}|{registry_fingerprint()}".encode(), digest_size=8).hexdigest()
+
+def new_digest():
+    return hashlib.blake2b(digest_size=20)
+
+def content_digest(binary_stream) -> str:
+    digest = new_digest()
+    if binary_stream.seekable(): binary_stream.seek(0)
+    for chunk in iter(lambda: binary_stream.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    if binary_stream.seekable(): binary_stream.seek(0)
+    return digest.hexdigest()
+
+def digest_key(digest: str) -> str:
+    # A cache key for an already computed content_digest, e.g. one hashed while a request body streamed in.
+    return f"{digest}-{PARSER_VERSION}-{config_fingerprint()}"
+
+def content_key(binary_stream) -> str:
+    return digest_key(content_digest(binary_stream))
+
+def member_key(cache_key: str, member: str = None) -> str:
+    # One key per log of an archive.
+    return f"{cache_key}:{member}" if member else cache_key
+
+def key_digest(cache_key: str) -> str:
+    # The bytes-only part of a content_key (plus the archive member, if any), e.g. for deduplicating stored files.
+    digest, _, rest = cache_key.partition("-")
+    member = rest.partition(":")[2]
+    return f"{digest}:{member}" if member else digest
+
+class AnalysisCache:
+    def __init__(self, max_entries: int = 8, disk_dir: str = None, max_disk_bytes: int = 2 << 30):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir: os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        value = self._read_disk(key)
+        if value is not None: self._remember(key, value)
+        return value
+
+    def put(self, key: str, value):
+        self._remember(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, key: str, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key: str, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + ".pkl")
+
+    def _read_disk(self, key: str):
+        if not self.disk_dir: return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f: value = pickle.load(f)
+            os.utime(path)  # mtime doubles as the last-access time for eviction
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key: str, value):
+        if not self.disk_dir: return
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".pkl"): continue
+            try: stat = os.stat(os.path.join(self.disk_dir, name))
+            except OSError: continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes: break
+            try: os.remove(os.path.join(self.disk_dir, name))
+            except OSError: continue
+            total -= size
@@ -0,0 +1,226 @@
+# analysis_service.py
+"""
+Local HTTP/JSON analysis service for scripts (e.g. the MES integration), separate from the Streamlit UI.
+
+    python analysis_service.py --port 8765 --workers 4
+    curl --data-binary @tool.log http://127.0.0.1:8765/analyze
+    curl --data-binary @tool.log.gz "http://127.0.0.1:8765/analyze?sections=alarms_with_context,job_details,alarm_counts"
+    curl -H "Transfer-Encoding: chunked" --data-binary @tool.log http://127.0.0.1:8765/parse
+
+POST /analyze  analyze_data / perform_eda sections as JSON: {"summary": {...}, "eda": {...}};
+               ?sections= limits the output (and the work) to the named sections.
+POST /parse    the parsed event table: {"events": n, "records": [...]}.
+GET  /health   pool size and the section names.
+Both POST endpoints take the log (plain or compressed) as the request body, with Content-Length
+or chunked transfer encoding. A zip holding several logs needs ?member= naming one of them
+(400 otherwise); logs are never merged into one analysis.
+
+The body is spooled to a temporary file while it is hashed, so it never sits in memory whole.
+Work runs on a pool of worker processes that are started and warmed (imports and code tables)
+before the first request, and the encoded JSON is cached by content hash, so a repeated log is
+answered without parsing. Concurrent requests for the same log and sections share one run.
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Mapping
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+from analysis_cache import AnalysisCache, digest_key, new_digest
+from analyzer import EDA_SECTIONS, SUMMARY_SECTIONS
+from code_tables import get_tables
+from config import CACHE_DIR, CACHE_MAX_BYTES, SERVICE_CACHE_ENTRIES, SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS
+from event_table import parse_log_frame, parse_log_path_frame
+from pipeline import analyze_frame
+
+BODY_CHUNK_SIZE = 1 << 20
+ENDPOINTS = ('/analyze', '/parse')
+
+def to_jsonable(value):
+    """Analysis output (frames, series, NumPy and pandas scalars) as plain JSON values; missing values become None."""
+    if isinstance(value, pd.DataFrame): return [to_jsonable(row) for row in value.to_dict('records')]
+    if isinstance(value, pd.Series): return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, Mapping): return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, np.ndarray)): return [to_jsonable(v) for v in value]
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)): return None
+    if isinstance(value, (pd.Timedelta, timedelta)): return value.total_seconds()
+    if isinstance(value, (datetime, date)): return value.isoformat()
+    if isinstance(value, np.generic): return value.item()
+    return value if isinstance(value, (str, int, float, bool)) else str(value)
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+def _warm():
+    # Runs once in each worker process: the heavy imports are done at module load, this compiles the code tables.
+    get_tables()
+    return os.getpid()
+
+def run_request(path: str, endpoint: str, sections: tuple = (), member: str = None) -> bytes:
+    """The encoded JSON response for a spooled log; runs in a pool worker."""
+    if member:
+        with open(path, 'rb') as f: df = parse_log_frame(f, member)
+    else:
+        df = parse_log_path_frame(path)
+    if endpoint == '/parse':
+        return b'{"events":%d,"records":%s}' % (len(df), df.to_json(orient='records', date_format='iso').encode())
+    _, summary, eda_results = analyze_frame(df)
+    wanted = set(sections) or set(SUMMARY_SECTIONS) | set(EDA_SECTIONS)
+    # Only the requested sections of the lazy mappings are ever computed.
+    return _encode({"events": len(df),
+                    "summary": {name: to_jsonable(summary[name]) for name in SUMMARY_SECTIONS if name in wanted},
+                    "eda": {name: to_jsonable(eda_results[name]) for name in EDA_SECTIONS if name in wanted}})
+
+class AnalysisService:
+    def __init__(self, workers: int = SERVICE_WORKERS, cache_dir: str = None, spool_dir: str = None):
+        self.workers = max(workers, 1)
+        self.spool_dir = spool_dir
+        self.cache = AnalysisCache(max_entries=SERVICE_CACHE_ENTRIES, disk_dir=cache_dir, max_disk_bytes=CACHE_MAX_BYTES)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_warm)
+        self._pending, self._lock = {}, threading.Lock()
+
+    def warm_up(self):
+        # Start every worker now rather than on the first requests.
+        for future in [self.pool.submit(_warm) for _ in range(self.workers)]: future.result()
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def spool(self, chunks) -> tuple:
+        """Writes the body chunks to a temporary file while hashing them; returns (path, content digest)."""
+        digest = new_digest()
+        fd, path = tempfile.mkstemp(prefix="analysis-", suffix=".log", dir=self.spool_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, digest.hexdigest()
+
+    def request_key(self, digest: str, endpoint: str, sections: tuple, member: str) -> str:
+        options = hashlib.blake2b(repr((endpoint, sorted(sections), member)).encode(), digest_size=8).hexdigest()
+        return f"{digest_key(digest)}-{options}"
+
+    def handle(self, chunks, endpoint: str, sections: tuple = (), member: str = None) -> tuple:
+        """(encoded JSON, cache hit) for one request body."""
+        path, digest = self.spool(chunks)
+        key = self.request_key(digest, endpoint, sections, member)
+        body = self.cache.get(key)
+        if body is not None:
+            os.remove(path)
+            return body, True
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner: future = self._pending[key] = self.pool.submit(run_request, path, endpoint, tuple(sections), member)
+        # A request that joins a run already in flight does not need its own copy of the log.
+        if owner: future.add_done_callback(partial(self._finish, key, path))
+        else: os.remove(path)
+        return future.result(), False
+
+    def _finish(self, key: str, path: str, future):
+        os.remove(path)
+        with self._lock: self._pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None: self.cache.put(key, future.result())
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so scripts can reuse one connection
+    service: AnalysisService = None
+
+    def _send(self, status: int, body: bytes, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items(): self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._send(status, _encode({"error": message}))
+
+    def _body_chunks(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0: break
+                yield from self._read_exactly(size)
+                self.rfile.readline()  # CRLF after each chunk
+            while self.rfile.readline() not in (b"\r\n", b"\n", b""): pass  # trailers
+        else:
+            yield from self._read_exactly(int(self.headers.get("Content-Length", 0)))
+
+    def _read_exactly(self, remaining: int):
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, BODY_CHUNK_SIZE))
+            if not chunk: raise ConnectionError("request body ended early")
+            remaining -= len(chunk)
+            yield chunk
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/health": return self._error(404, f"unknown path {self.path}")
+        self._send(200, _encode({"status": "ok", "workers": self.service.workers,
+                                 "sections": {"summary": list(SUMMARY_SECTIONS), "eda": list(EDA_SECTIONS)}}))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path not in ENDPOINTS:
+            self.close_connection = True  # the unread body would be taken for the next request
+            return self._error(404, f"unknown path {url.path}")
+        if "Content-Length" not in self.headers and self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            self.close_connection = True
+            return self._error(411, "send the log as the request body with Content-Length or chunked encoding")
+        query = parse_qs(url.query)
+        sections = tuple(s for value in query.get("sections", []) for s in value.split(",") if s)
+        unknown = set(sections) - set(SUMMARY_SECTIONS) - set(EDA_SECTIONS)
+        if unknown:
+            self.close_connection = True
+            return self._error(400, f"unknown sections: {', '.join(sorted(unknown))}")
+        member = query.get("member", [None])[0]
+        try:
+            body, hit = self.service.handle(self._body_chunks(), url.path, sections, member)
+        except (ConnectionError, ValueError) as exc:
+            self.close_connection = True
+            return self._error(400, str(exc))
+        except Exception as exc:
+            return self._error(500, f"{type(exc).__name__}: {exc}")
+        self._send(200, body, {"X-Cache": "hit" if hit else "miss"})
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, workers: int = SERVICE_WORKERS, cache_dir: str = None) -> ThreadingHTTPServer:
+    """A started-up (warm) server; call serve_forever() on it."""
+    service = AnalysisService(workers, cache_dir)
+    service.warm_up()
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.service = service
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve log parsing and analysis over local HTTP/JSON.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="analysis worker processes")
+    parser.add_argument("--cache-dir", default=os.path.join(CACHE_DIR, "service") if CACHE_DIR else None,
+                        help="directory for cached JSON responses (memory only when unset)")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.workers, args.cache_dir)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {server.service.workers} workers", flush=True)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+if __name__ == "__main__":
+    main()
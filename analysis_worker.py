@@ -0,0 +1,142 @@
+# analysis_worker.py
+"""
+Runs parse + analysis on a background thread so a caller can show progress
+(input bytes consumed, so compressed uploads report progress through
+the compressed data), partial results (event counts, alarms found so far) and
+cancel the run, e.g. when a different file is uploaded.
+
+    job = AnalysisJob(open(path, 'rb')).start()
+    while not job.done:
+        print(job.stage, job.progress, job.partial()['events'])
+        time.sleep(0.5)
+    df, summary, eda_results = job.result
+"""
+import io
+import os
+import threading
+import time
+from collections import Counter
+import profiling
+from code_tables import get_tables
+from log_parser import iter_input_events
+from event_table import EventColumns, event_name
+from pipeline import analyze_frame
+
+PUBLISH_INTERVAL = 0.25  # seconds between partial-result snapshots
+ALARM_EVENTS = ('Alarm Set', 'AlarmSet')
+
+class AnalysisCancelled(Exception):
+    pass
+
+class _ProgressReader(io.RawIOBase):
+    """Counts bytes read from the wrapped stream and stops the parse once the job is cancelled."""
+    def __init__(self, raw, job: 'AnalysisJob'):
+        self.raw, self.job = raw, job
+
+    def readable(self): return True
+    def seekable(self): return self.raw.seekable()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        position = self.raw.seek(offset, whence)
+        self.job.bytes_read = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        if self.job.cancelled: raise AnalysisCancelled()
+        data = self.raw.read(size)
+        self.job.bytes_read += len(data)
+        return data
+
+def _stream_size(stream) -> int:
+    if hasattr(stream, 'getbuffer'): return stream.getbuffer().nbytes
+    try: return os.fstat(stream.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation): return 0
+
+class AnalysisJob:
+    def __init__(self, binary_stream, collect_performance: bool = False, member: str = None):
+        self.stream, self.member = binary_stream, member
+        self.total_bytes = _stream_size(binary_stream)
+        self.collect_performance = collect_performance
+        self.bytes_read = 0
+        self.stage = "queued"
+        self.result = self.error = self.profiler = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._partial = {"events": 0, "event_counts": {}, "alarms": [], "lot_ids": []}
+        self._thread = threading.Thread(target=self._run, name="log-analysis", daemon=True)
+
+    def start(self) -> 'AnalysisJob':
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive() and self.stage != "queued"
+
+    def wait(self, timeout: float = None) -> bool:
+        self._thread.join(timeout)
+        return self.done
+
+    @property
+    def progress(self) -> float:
+        # Parsing is most of the work; the frame and analysis stages fill the last 10%.
+        if self.stage == "done": return 1.0
+        parsed = min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else 0.0
+        return 0.9 * parsed if self.stage == "parsing" else 0.9 + (0.05 if self.stage == "analyzing" else 0.0)
+
+    def partial(self) -> dict:
+        with self._lock: return dict(self._partial, bytes_read=self.bytes_read)
+
+    def _publish(self, events: int, counts: Counter, alarms: list, lot_ids: dict):
+        with self._lock:
+            self._partial = {"events": events, "event_counts": dict(counts), "alarms": list(alarms), "lot_ids": list(lot_ids)}
+
+    def _run(self):
+        try:
+            if self.collect_performance:
+                # tracemalloc fills the Performance panel's peak_mb column; it only runs on this opt-in profiled run.
+                with profiling.profile(trace_memory=True, use_cprofile=True) as self.profiler: self.result = self._analyze()
+            else:
+                self.result = self._analyze()
+            self.stage = "done"
+        except AnalysisCancelled:
+            self.stage = "cancelled"
+        except Exception as exc:
+            self.error, self.stage = exc, "failed"
+
+    def _analyze(self) -> tuple:
+        self.stage = "parsing"
+        alarm_db = get_tables().alarm_db
+        columns, counts, alarms, lot_ids = EventColumns(), Counter(), [], {}
+        next_publish = time.monotonic() + PUBLISH_INTERVAL
+        with profiling.stage("parse") as stage:
+            for event in iter_input_events(_ProgressReader(self.stream, self), self.member):
+                columns.append(event)
+                details = event['details']
+                name = event_name(details)
+                counts[name] += 1
+                if name in ALARM_EVENTS and details.get('AlarmID') is not None:
+                    alarm_id = int(details['AlarmID'])
+                    alarms.append({"Time": event['timestamp'], "Alarm ID": alarm_id,
+                                   "Description": alarm_db.get(alarm_id, {}).get('description', 'Unknown')})
+                if name == 'LOADSTART' and details.get('LotID') is not None: lot_ids[details['LotID']] = None
+                if time.monotonic() >= next_publish:
+                    self._publish(columns.size, counts, alarms, lot_ids)
+                    next_publish = time.monotonic() + PUBLISH_INTERVAL
+            stage.rows = columns.size
+        self._publish(columns.size, counts, alarms, lot_ids)
+
+        if self.cancelled: raise AnalysisCancelled()
+        self.stage = "building table"
+        df = columns.to_frame()
+        del columns
+        if self.cancelled: raise AnalysisCancelled()
+        self.stage = "analyzing"
+        return analyze_frame(df)
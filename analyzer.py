@@ -1,28 +1,36 @@
 # analyzer.py
+from collections.abc import Mapping
+from functools import partial
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from config import ALARM_DB, CEID_MAP
+from config import TIMESTAMP_FORMAT
+from code_tables import get_tables
+from event_index import EventIndex
+import profiling
 
-def get_mapping_details(df: pd.DataFrame) -> dict:
+@profiling.timed("analyzer.get_mapping_details")
+def get_mapping_details(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    if index is None: index = EventIndex(df)
     details = {"start_time": "N/A", "end_time": "N/A", "duration_sec": 0.0}
-    start_events = df[df['EventName'] == 'MagazineDocked'].sort_values('timestamp')
-    end_events = df[df['EventName'] == 'MappingCompleted'].sort_values('timestamp')
+    start_events = index.rows('MagazineDocked').sort_values('timestamp')
+    end_events = index.rows('MappingCompleted').sort_values('timestamp')
     if not start_events.empty and not end_events.empty:
-        start_time_str = start_events.iloc[0]['timestamp']
-        end_event = end_events[end_events['timestamp'] > start_time_str]
+        t_start = start_events.iloc[0]['timestamp']
+        end_event = end_events[end_events['timestamp'] > t_start]
         if not end_event.empty:
-            end_time_str = end_event.iloc[0]['timestamp']
-            t_start = datetime.strptime(start_time_str, "%Y/%m/%d %H:%M:%S.%f")
-            t_end = datetime.strptime(end_time_str, "%Y/%m/%d %H:%M:%S.%f")
+            t_end = end_event.iloc[0]['timestamp']
             details["start_time"] = t_start.strftime("%H:%M:%S")
             details["end_time"] = t_end.strftime("%H:%M:%S")
             details["duration_sec"] = (t_end - t_start).total_seconds()
     return details
 
-def get_panel_slot_map(df: pd.DataFrame) -> dict:
+@profiling.timed("analyzer.get_panel_slot_map")
+def get_panel_slot_map(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    if index is None: index = EventIndex(df)
     panel_info = {"panel_ids": [], "panel_slot_map": pd.DataFrame()}
     if 'details.PanelID' in df.columns and 'details.SlotID' in df.columns:
-        id_read_events = df[df['EventName'] == 'IDRead'].copy()
+        id_read_events = index.rows('IDRead')
         if not id_read_events.empty:
             slot_map_df = id_read_events[['details.PanelID', 'details.SlotID']].dropna(subset=['details.PanelID', 'details.SlotID']).drop_duplicates()
             if not slot_map_df.empty:
@@ -33,122 +41,365 @@ def get_panel_slot_map(df: pd.DataFrame) -> dict:
                 panel_info["panel_slot_map"] = slot_map_df
     return panel_info
 
-def get_cycle_time_details(df: pd.DataFrame) -> dict:
+@profiling.timed("analyzer.get_cycle_time_details")
+def get_cycle_time_details(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    if index is None: index = EventIndex(df)
     details = {"total_processing_time_sec": 0.0, "cycle_times": pd.DataFrame()}
-    start_events = df[df['EventName'] == 'LoadStarted']
-    end_events = df[df['EventName'] == 'LoadToToolCompleted']
+    start_events = index.rows('LoadStarted')
+    end_events = index.rows('LoadToToolCompleted')
     if not start_events.empty and not end_events.empty:
-        t_start = pd.to_datetime(start_events.iloc[0]['timestamp'])
-        t_end = pd.to_datetime(end_events.iloc[-1]['timestamp'])
+        t_start = start_events.iloc[0]['timestamp']
+        t_end = end_events.iloc[-1]['timestamp']
         details["total_processing_time_sec"] = (t_end - t_start).total_seconds()
-        loaded_events = df[df['EventName'] == 'LoadedToTool'].sort_values('timestamp').copy()
+        loaded_events = index.rows('LoadedToTool').sort_values('timestamp')
         if not loaded_events.empty:
-            loaded_events['timestamp_dt'] = pd.to_datetime(loaded_events['timestamp'])
-            first_panel_time = loaded_events['timestamp_dt'].iloc[0]
+            first_panel_time = loaded_events['timestamp'].iloc[0]
             initial_cycle_duration = (first_panel_time - t_start).total_seconds()
-            cycle_durations = loaded_events['timestamp_dt'].diff().dt.total_seconds().fillna(initial_cycle_duration)
+            cycle_durations = loaded_events['timestamp'].diff().dt.total_seconds().fillna(initial_cycle_duration)
             cycle_df = pd.DataFrame({'Panel Index': range(1, len(loaded_events) + 1), 'Cycle Time (sec)': cycle_durations.values})
             details['cycle_times'] = cycle_df.set_index('Panel Index')
     return details
 
-def get_lot_to_panel_map(df: pd.DataFrame) -> dict:
-    start_events = df[df['EventName'] == 'LOADSTART'][['timestamp', 'details.LotID']].dropna().rename(columns={'details.LotID': 'LotID'})
-    id_read_events = df[df['EventName'] == 'IDRead'][['timestamp', 'details.PanelID']].dropna(subset=['details.PanelID']).rename(columns={'details.PanelID': 'PanelID'})
+@profiling.timed("analyzer.get_lot_to_panel_map")
+def get_lot_to_panel_map(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    if index is None: index = EventIndex(df)
+    if 'details.LotID' not in df.columns or 'details.PanelID' not in df.columns: return {}
+    start_events = index.rows('LOADSTART')[['timestamp', 'details.LotID']].dropna().rename(columns={'details.LotID': 'LotID'})
+    id_read_events = index.rows('IDRead')[['timestamp', 'details.PanelID']].dropna(subset=['details.PanelID']).rename(columns={'details.PanelID': 'PanelID'})
     if start_events.empty or id_read_events.empty:
         return {}
-    start_events['timestamp'] = pd.to_datetime(start_events['timestamp'])
-    id_read_events['timestamp'] = pd.to_datetime(id_read_events['timestamp'])
     merged_df = pd.merge_asof(id_read_events.sort_values('timestamp'), start_events.sort_values('timestamp'), on='timestamp', direction='backward')
     if 'LotID' not in merged_df.columns or merged_df['LotID'].isnull().all():
         return {}
-    return merged_df.groupby('LotID')['PanelID'].unique().apply(list).to_dict()
-
-def perform_eda(df: pd.DataFrame) -> dict:
-    eda_results = {'event_counts': pd.Series(dtype='int64'), 'alarm_counts': pd.Series(dtype='int64'), 'alarm_table': pd.DataFrame()}
-    if 'EventName' in df.columns:
-        eda_results['event_counts'] = df['EventName'].value_counts()
-    if 'details.AlarmID' in df.columns and 'AlarmDescription' in df.columns:
-        alarm_events = df[df['EventName'].isin(['Alarm Set', 'AlarmSet'])].copy()
-        if not alarm_events.empty:
-            eda_results['alarm_counts'] = alarm_events['AlarmDescription'].value_counts()
-            display_cols = ['timestamp', 'EventName', 'details.AlarmID', 'AlarmDescription']
-            eda_results['alarm_table'] = alarm_events[[c for c in display_cols if c in alarm_events.columns]]
-    return eda_results
-
-def format_time(timestamp_str: str) -> str:
+    return merged_df.groupby('LotID', observed=True)['PanelID'].unique().apply(list).to_dict()
+
+PANEL_TRACE_COLUMNS = ['Panel ID', 'Lot ID', 'Slot', 'IDRead', 'LoadedToTool', 'Alarm IDs']
+
+def _sorted_times(rows: pd.DataFrame) -> np.ndarray:
+    return np.sort(rows['timestamp'].dropna().to_numpy(dtype='datetime64[us]'))
+
+@profiling.timed("analyzer.get_panel_traces")
+def get_panel_traces(df: pd.DataFrame, index: EventIndex = None) -> pd.DataFrame:
+    """
+    One row per panel IDRead: its lot (from the report, else the preceding LOADSTART), slot,
+    the next LoadedToTool time and the AlarmIDs set in between. Feeds the cross-log panel index.
+    """
+    if index is None: index = EventIndex(df)
+    if 'details.PanelID' not in df.columns: return pd.DataFrame(columns=PANEL_TRACE_COLUMNS)
+    reads = index.rows('IDRead')
+    reads = reads[reads['details.PanelID'].notna() & reads['timestamp'].notna()].sort_values('timestamp', kind='stable')
+    if reads.empty: return pd.DataFrame(columns=PANEL_TRACE_COLUMNS)
+    read_times = reads['timestamp'].to_numpy(dtype='datetime64[us]')
+
+    lots = reads['details.LotID'].astype('object') if 'details.LotID' in reads.columns else pd.Series(None, index=reads.index, dtype='object')
+    starts = index.rows('LOADSTART').dropna(subset=['timestamp', 'details.LotID']) if 'details.LotID' in df.columns else pd.DataFrame()
+    if lots.isna().any() and not starts.empty:
+        starts = starts.sort_values('timestamp', kind='stable')
+        before = np.searchsorted(starts['timestamp'].to_numpy(dtype='datetime64[us]'), read_times, side='right') - 1
+        start_lots = starts['details.LotID'].astype('object').to_numpy()[np.maximum(before, 0)]
+        lots = lots.mask(lots.isna().to_numpy() & (before >= 0), start_lots)
+
+    loaded_times = _sorted_times(index.rows('LoadedToTool'))
+    after = np.searchsorted(loaded_times, read_times, side='left')
+    has_load = after < len(loaded_times)
+    loaded = np.full(len(reads), np.datetime64('NaT'), dtype='datetime64[us]')
+    loaded[has_load] = loaded_times[after[has_load]]
+
+    alarm_ids = [[] for _ in range(len(reads))]
+    if 'details.AlarmID' in df.columns:
+        alarms = index.rows('Alarm Set', 'AlarmSet').dropna(subset=['timestamp', 'details.AlarmID']).sort_values('timestamp', kind='stable')
+        alarm_times, ids = alarms['timestamp'].to_numpy(dtype='datetime64[us]'), alarms['details.AlarmID'].astype('int64').tolist()
+        first = np.searchsorted(alarm_times, read_times, side='left')
+        last = np.searchsorted(alarm_times, loaded, side='right')
+        alarm_ids = [ids[lo:hi] if ok else [] for lo, hi, ok in zip(first, last, has_load)]
+
+    slots = pd.to_numeric(reads['details.SlotID'], errors='coerce').astype('Int64').array if 'details.SlotID' in reads.columns else pd.NA
+    return pd.DataFrame({'Panel ID': reads['details.PanelID'].astype(str).to_numpy(), 'Lot ID': lots.to_numpy(), 'Slot': slots,
+                         'IDRead': read_times, 'LoadedToTool': loaded, 'Alarm IDs': alarm_ids}).reset_index(drop=True)
+
+def _event_counts(df: pd.DataFrame, index: EventIndex, sections) -> pd.Series:
+    if 'EventName' not in df.columns: return pd.Series(dtype='int64')
+    event_counts = pd.Series({name: len(pos) for name, pos in index.by_event.items()}, dtype='int64')
+    return event_counts.sort_values(ascending=False, kind='stable').rename_axis('EventName').rename('count')
+
+def _alarm_events(df: pd.DataFrame, index: EventIndex, sections) -> pd.DataFrame:
+    if 'details.AlarmID' not in df.columns or 'AlarmDescription' not in df.columns: return df.iloc[:0]
+    return df.iloc[index.positions('Alarm Set', 'AlarmSet')]
+
+def _alarm_counts(df: pd.DataFrame, index: EventIndex, sections) -> pd.Series:
+    alarm_events = sections.memo('alarm_events', _alarm_events)
+    if alarm_events.empty: return pd.Series(dtype='int64')
+    alarm_counts = alarm_events['AlarmDescription'].value_counts()
+    return alarm_counts[alarm_counts > 0]
+
+def _alarm_table(df: pd.DataFrame, index: EventIndex, sections) -> pd.DataFrame:
+    alarm_events = sections.memo('alarm_events', _alarm_events)
+    if alarm_events.empty: return pd.DataFrame()
+    display_cols = ['timestamp', 'EventName', 'details.AlarmID', 'AlarmDescription']
+    return alarm_events[[c for c in display_cols if c in alarm_events.columns]]
+
+EDA_SECTIONS = {'event_counts': _event_counts, 'alarm_counts': _alarm_counts, 'alarm_table': _alarm_table}
+
+def lazy_eda(df: pd.DataFrame, index: EventIndex = None) -> 'LazySections':
+    return LazySections(EDA_SECTIONS, df, index)
+
+@profiling.timed("perform_eda")
+def perform_eda(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    return dict(lazy_eda(df, index))
+
+def format_time(timestamp) -> str:
     try:
-        return datetime.strptime(timestamp_str, "%Y/%m/%d %H:%M:%S.%f").strftime("%H:%M:%S")
-    except (ValueError, TypeError):
-        return timestamp_str
+        if isinstance(timestamp, str): timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+        return timestamp.strftime("%H:%M:%S")
+    except (ValueError, TypeError, AttributeError):
+        return timestamp
+
+def stoppable_alarm_codes() -> set:
+    return get_tables().stoppable_codes()
+
+def next_recovery_positions(event_names: pd.Series) -> np.ndarray:
+    # For each row, the position of the first later row that is not 'Alarm Set' (reverse cumulative min);
+    # rows with no such successor recover at the last row of the log.
+    n = len(event_names)
+    positions = np.arange(n)
+    candidates = np.where((event_names != 'Alarm Set').to_numpy(dtype=bool), positions, n)
+    first_at_or_after = np.minimum.accumulate(candidates[::-1])[::-1]
+    next_positions = np.append(first_at_or_after[1:], n)
+    return np.where(next_positions == n, n - 1, next_positions)
+
+def get_downtime_intervals(df: pd.DataFrame, index: EventIndex = None) -> tuple:
+    """Row positions of stoppable alarms, of their recovery rows, and the downtime seconds between them."""
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0))
+    if df.empty or 'details.AlarmID' not in df.columns: return empty
+    alarm_positions = np.flatnonzero(get_tables().is_stoppable(df['details.AlarmID']))
+    if len(alarm_positions) == 0: return empty
+    recovery_positions = next_recovery_positions(df['EventName'])[alarm_positions]
+    timestamps = df['timestamp'].to_numpy(dtype='datetime64[us]')
+    durations = (timestamps[recovery_positions] - timestamps[alarm_positions]) / np.timedelta64(1, 's')
+    return alarm_positions, recovery_positions, durations
+
+@profiling.timed("analyzer.get_downtime_incidents")
+def get_downtime_incidents(df: pd.DataFrame, index: EventIndex = None, job: int = None) -> tuple:
+    """Downtime incidents and their total seconds; with job (1-based, as in job_details), only those raised in that job."""
+    alarm_positions, recovery_positions, durations = get_downtime_intervals(df, index)
+    keep = durations > 0
+    if job is not None and keep.any():
+        # Same rule as get_job_details: an incident belongs to the job its alarm was raised in.
+        keep &= assign_job_ids(df, index)[0][alarm_positions] == job - 1
+    if not keep.any(): return [], 0.0
+
+    timestamps = df['timestamp'].reset_index(drop=True)
+    descriptions = get_tables().alarm_descriptions(df['details.AlarmID'].iloc[alarm_positions[keep]])
+    kept_durations = durations[keep].tolist()
+    downtime_incidents = [
+        {'Alarm Time': alarm_time, 'Alarm Description': description, 'Recovery Time': recovery_time, 'Downtime (sec)': round(duration, 2)}
+        for alarm_time, description, recovery_time, duration in zip(
+            timestamps.iloc[alarm_positions[keep]].dt.strftime("%H:%M:%S"), descriptions,
+            timestamps.iloc[recovery_positions[keep]].dt.strftime("%H:%M:%S"), kept_durations)
+    ]
+    return downtime_incidents, sum(kept_durations)
+
+def assign_job_ids(df: pd.DataFrame, index: EventIndex = None) -> tuple:
+    """
+    Splits the log into LOADSTART -> LoadToToolCompleted jobs.
+    Returns (job id per row, -1 outside any job; start times; end times; completed flags; LOADSTART row positions).
+    A job without LoadToToolCompleted ends at its last event before the next LOADSTART.
+    """
+    if index is None: index = EventIndex(df)
+    timestamps = df['timestamp'].to_numpy(dtype='datetime64[us]')
+    start_positions = index.positions('LOADSTART')
+    start_positions = start_positions[np.argsort(timestamps[start_positions], kind='stable')]
+    start_times = timestamps[start_positions]
+    if len(start_times) == 0:
+        return np.full(len(df), -1), start_times, start_times, np.zeros(0, dtype=bool), start_positions
+
+    never = np.datetime64('9999-12-31', 'us')
+    next_start = np.append(start_times[1:], never)
+    end_candidates = np.sort(timestamps[index.positions('LoadToToolCompleted')])
+    k = np.searchsorted(end_candidates, start_times, side='left')
+    candidate = end_candidates[np.minimum(k, max(len(end_candidates) - 1, 0))] if len(end_candidates) else next_start
+    completed = (k < len(end_candidates)) & (candidate < next_start)
+    sorted_times = index.sorted_timestamps.astype('datetime64[us]')
+    last_before_next = sorted_times[np.searchsorted(sorted_times, next_start, side='left') - 1]
+    end_times = np.where(completed, candidate, last_before_next)
+
+    job_ids = np.searchsorted(start_times, timestamps, side='right') - 1
+    inside = (job_ids >= 0) & (timestamps <= end_times[np.maximum(job_ids, 0)])
+    return np.where(inside, job_ids, -1), start_times, end_times, completed, start_positions
+
+def _seconds(deltas) -> np.ndarray:
+    return deltas / np.timedelta64(1, 's')
+
+@profiling.timed("analyzer.get_job_details")
+def get_job_details(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    details = {"jobs": pd.DataFrame(), "cycle_times": pd.DataFrame()}
+    if df.empty: return details
+    if index is None: index = EventIndex(df)
+    job_ids, start_times, end_times, completed, start_positions = assign_job_ids(df, index)
+    n_jobs = len(start_times)
+    if n_jobs == 0: return details
+    timestamps = df['timestamp'].to_numpy(dtype='datetime64[us]')
+
+    # Panels: distinct PanelIDs read (with a slot) inside each job.
+    panels = np.zeros(n_jobs, dtype=np.int64)
+    if 'details.PanelID' in df.columns and 'details.SlotID' in df.columns:
+        reads = index.positions('IDRead')
+        reads = reads[job_ids[reads] >= 0]
+        pairs = pd.DataFrame({'job': job_ids[reads], 'panel': df['details.PanelID'].to_numpy()[reads],
+                              'slot': df['details.SlotID'].to_numpy()[reads]}).dropna()
+        counts = pairs.drop_duplicates(['job', 'panel'])['job'].value_counts()
+        panels[counts.index.to_numpy()] = counts.to_numpy()
+
+    # Cycle times: gaps between consecutive LoadedToTool events, the first measured from the job start.
+    loaded = index.positions('LoadedToTool')
+    loaded = loaded[job_ids[loaded] >= 0]
+    loaded = loaded[np.lexsort((timestamps[loaded], job_ids[loaded]))]
+    loaded_jobs, loaded_times = job_ids[loaded], timestamps[loaded]
+    first_in_job = np.ones(len(loaded), dtype=bool)
+    first_in_job[1:] = loaded_jobs[1:] != loaded_jobs[:-1]
+    previous = np.where(first_in_job, start_times[loaded_jobs], np.roll(loaded_times, 1))
+    cycle_seconds = _seconds(loaded_times - previous)
+    panel_index = np.arange(len(loaded)) - np.maximum.accumulate(np.where(first_in_job, np.arange(len(loaded)), 0)) + 1
 
-def analyze_data(df: pd.DataFrame) -> dict:
-    summary = {
+    # Mapping: first MagazineDocked in a job to the next MappingCompleted in the same job.
+    mapping = np.zeros(n_jobs)
+    docked = index.positions('MagazineDocked')
+    docked = docked[job_ids[docked] >= 0]
+    mapped = index.positions('MappingCompleted')
+    if len(docked) and len(mapped):
+        docked_first = pd.Series(timestamps[docked]).groupby(job_ids[docked]).min()
+        mapped = mapped[np.argsort(timestamps[mapped], kind='stable')]
+        k = np.searchsorted(timestamps[mapped], docked_first.to_numpy(), side='right')
+        found = k < len(mapped)
+        hit = mapped[np.minimum(k, len(mapped) - 1)]
+        same_job = found & (job_ids[hit] == docked_first.index.to_numpy())
+        mapping[docked_first.index.to_numpy()[same_job]] = _seconds(timestamps[hit[same_job]] - docked_first.to_numpy()[same_job])
+
+    # Downtime: each incident is charged to the job its alarm was raised in.
+    alarm_positions, _, durations = get_downtime_intervals(df, index)
+    charged = (durations > 0) & (job_ids[alarm_positions] >= 0)
+    downtime = np.bincount(job_ids[alarm_positions[charged]], weights=durations[charged], minlength=n_jobs)
+    incidents = np.bincount(job_ids[alarm_positions[charged]], minlength=n_jobs)
+
+    processing = _seconds(end_times - start_times)
+    lot_ids = df['details.LotID'].to_numpy()[start_positions] if 'details.LotID' in df.columns else np.full(n_jobs, None)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_cycle = np.where(panels > 0, processing / np.maximum(panels, 1), 0.0)
+        uph = np.where(processing > 0, panels / np.where(processing > 0, processing, 1) * 3600, 0.0)
+    details["jobs"] = pd.DataFrame({
+        'Job': np.arange(1, n_jobs + 1), 'Lot ID': lot_ids, 'Start': start_times, 'End': end_times,
+        'Status': np.where(completed, "Completed", "Did not complete"), 'Panels': panels,
+        'Processing Time (sec)': processing, 'Avg. Cycle Time (sec)': avg_cycle, 'UPH': uph,
+        'Mapping Duration (sec)': mapping, 'Downtime (sec)': np.round(downtime, 2), 'Downtime Incidents': incidents,
+    })
+    details["cycle_times"] = pd.DataFrame({'Job': loaded_jobs + 1, 'Panel Index': panel_index, 'Cycle Time (sec)': cycle_seconds})
+    return details
+
+class LazySections(Mapping):
+    """
+    A read-only dict of analysis sections where each section is computed on first access and memoized.
+    sections maps each key to a function (df, index, this mapping) -> value.
+    """
+    def __init__(self, sections: dict, df: pd.DataFrame, index: EventIndex = None):
+        self.sections, self.df, self._index = sections, df, index
+        self._values = {}
+
+    @property
+    def index(self) -> EventIndex:
+        if self._index is None: self._index = EventIndex(self.df)
+        return self._index
+
+    def memo(self, name: str, compute):
+        # Shared intermediate results (e.g. downtime incidents feed two sections) are memoized alongside the sections.
+        if name not in self._values: self._values[name] = compute(self.df, self.index, self)
+        return self._values[name]
+
+    def __getitem__(self, key: str):
+        if key not in self.sections: raise KeyError(key)
+        return self.memo(key, self.sections[key])
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def computed(self) -> list:
+        return [key for key in self.sections if key in self._values]
+
+    def compute_all(self) -> 'LazySections':
+        for key in self.sections: self[key]
+        return self
+
+def _unique_values(column: str, df: pd.DataFrame, index: EventIndex, sections) -> list:
+    return df[column].dropna().unique().tolist() if column in df.columns else []
+
+def _section(func, df: pd.DataFrame, index: EventIndex, sections):
+    return func(df, index)
+
+def _machine_statuses(df: pd.DataFrame, index: EventIndex, sections) -> list:
+    if 'EventName' not in df.columns: return []
+    status_df = df.iloc[index.positions('Control State Local', 'Control State Remote')]
+    return status_df['EventName'].astype('object').str.replace("Control State ", "").unique().tolist()
+
+def _has_job(index: EventIndex) -> bool:
+    return len(index.positions('LOADSTART')) > 0
+
+def _job_status(df: pd.DataFrame, index: EventIndex, sections) -> str:
+    if not _has_job(index): return "No Job Found"
+    return "Completed" if len(index.positions('LoadToToolCompleted')) else "Did not complete"
+
+def _lot_id(df: pd.DataFrame, index: EventIndex, sections):
+    if not _has_job(index): return "N/A"
+    return df.iloc[index.positions('LOADSTART')[0]].get('details.LotID', "N/A")
+
+def _panel_count(df: pd.DataFrame, index: EventIndex, sections) -> int:
+    return len(sections['panel_info']['panel_ids']) if _has_job(index) else 0
+
+def _downtime(df: pd.DataFrame, index: EventIndex, sections) -> tuple:
+    return sections.memo('downtime', partial(_section, get_downtime_incidents))
+
+def _total_downtime(df: pd.DataFrame, index: EventIndex, sections) -> float:
+    return round(_downtime(df, index, sections)[1], 2)
+
+def _alarms_with_context(df: pd.DataFrame, index: EventIndex, sections) -> list:
+    return _downtime(df, index, sections)[0]
+
+def _empty_section(key: str, df: pd.DataFrame, index: EventIndex, sections):
+    # analyze_data's values for an empty log.
+    defaults = {
         "job_status": "No Job Found", "lot_id": "N/A", "panel_count": 0, "total_downtime_sec": 0.0,
-        "alarms_with_context": [], "magazine_ids": [], "operator_ids": [], "machine_statuses": [],
-        "lot_ids": [], "mapping_details": {}, "panel_info": {}, "cycle_time_details": {}, "lot_to_panel_map": {}
+        "mapping_details": {}, "panel_info": {}, "cycle_time_details": {}, "lot_to_panel_map": {},
+        "job_details": {"jobs": pd.DataFrame(), "cycle_times": pd.DataFrame()},
+    }
+    return defaults.get(key, [])
+
+# Module-level functions and partials only, so a LazySections pickles into the analysis cache.
+SUMMARY_SECTIONS = {
+    "job_status": _job_status, "lot_id": _lot_id, "panel_count": _panel_count,
+    "total_downtime_sec": _total_downtime, "alarms_with_context": _alarms_with_context,
+    "magazine_ids": partial(_unique_values, 'details.MagazineID'), "operator_ids": partial(_unique_values, 'details.OperatorID'),
+    "machine_statuses": _machine_statuses, "lot_ids": partial(_unique_values, 'details.LotID'),
+    "mapping_details": partial(_section, get_mapping_details), "panel_info": partial(_section, get_panel_slot_map),
+    "cycle_time_details": partial(_section, get_cycle_time_details), "lot_to_panel_map": partial(_section, get_lot_to_panel_map),
+    "job_details": partial(_section, get_job_details),
+}
+EMPTY_SUMMARY_SECTIONS = {key: partial(_empty_section, key) for key in SUMMARY_SECTIONS}
+
+def lazy_summary(df: pd.DataFrame, index: EventIndex = None) -> LazySections:
+    """analyze_data's summary, computing each section only when it is first read."""
+    return LazySections(EMPTY_SUMMARY_SECTIONS if df.empty else SUMMARY_SECTIONS, df, index)
+
+@profiling.timed("analyze_data")
+def analyze_data(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    return dict(lazy_summary(df, index))
+
+def get_job_kpis(summary: dict) -> dict:
+    processing_time = summary['cycle_time_details'].get('total_processing_time_sec', 0.0)
+    panel_count = summary['panel_count']
+    return {
+        "total_processing_time_sec": processing_time, "panel_count": panel_count,
+        "avg_cycle_time_sec": (processing_time / panel_count) if panel_count > 0 else 0,
+        "uph": (panel_count / processing_time * 3600) if processing_time > 0 else 0,
+        "total_downtime_sec": summary['total_downtime_sec'],
     }
-    if df.empty: return summary
-
-    if 'details.OperatorID' in df.columns: summary['operator_ids'] = df['details.OperatorID'].dropna().unique().tolist()
-    if 'details.MagazineID' in df.columns: summary['magazine_ids'] = df['details.MagazineID'].dropna().unique().tolist()
-    if 'details.LotID' in df.columns: summary['lot_ids'] = df['details.LotID'].dropna().unique().tolist()
-    if 'EventName' in df.columns:
-        status_df = df[df['EventName'].isin(['Control State Local', 'Control State Remote'])]
-        summary['machine_statuses'] = status_df['EventName'].str.replace("Control State ", "").unique().tolist()
-        
-    summary['mapping_details'] = get_mapping_details(df)
-    summary['panel_info'] = get_panel_slot_map(df)
-    summary['cycle_time_details'] = get_cycle_time_details(df)
-    summary['lot_to_panel_map'] = get_lot_to_panel_map(df)
-    
-    start_events = df[df['EventName'] == 'LOADSTART']
-    if not start_events.empty:
-        first_start_event = start_events.iloc[0]
-        summary['lot_id'] = first_start_event.get('details.LotID', "N/A")
-        summary['panel_count'] = len(summary['panel_info']['panel_ids'])
-        end_events = df[df['EventName'] == 'LoadToToolCompleted']
-        summary['job_status'] = "Completed" if not end_events.empty else "Did not complete"
-            
-    downtime_incidents = []
-    total_downtime = 0.0
-    stoppable_alarm_codes = {k for k, v in ALARM_DB.items() if v.get('level') in ['Error', 'Alarm']}
-    
-    if 'details.AlarmID' in df.columns:
-        numeric_alarm_ids = pd.to_numeric(df['details.AlarmID'], errors='coerce')
-        fault_events = df[numeric_alarm_ids.isin(stoppable_alarm_codes)].copy()
-        
-        full_log_list = df.to_dict('records')
-        for index, alarm_row in fault_events.iterrows():
-            try:
-                alarm_time = datetime.strptime(alarm_row['timestamp'], "%Y/%m/%d %H:%M:%S.%f")
-                alarm_id = int(alarm_row['details.AlarmID'])
-                alarm_info = ALARM_DB.get(alarm_id, {'description': 'Unknown Alarm'})
-                alarm_log_index = df.index.get_loc(index)
-            except (KeyError, ValueError, TypeError):
-                continue
-
-            recovery_time = None
-            for i in range(alarm_log_index + 1, len(full_log_list)):
-                next_event = full_log_list[i]
-                if next_event.get('EventName') != 'Alarm Set':
-                    recovery_time = datetime.strptime(next_event['timestamp'], "%Y/%m/%d %H:%M:%S.%f")
-                    break
-            
-            if recovery_time is None and len(df) > 0:
-                recovery_time = datetime.strptime(df.iloc[-1]['timestamp'], "%Y/%m/%d %H:%M:%S.%f")
-
-            if recovery_time:
-                duration = (recovery_time - alarm_time).total_seconds()
-                if duration > 0:
-                    total_downtime += duration
-                    downtime_incidents.append({
-                        'Alarm Time': alarm_time.strftime("%H:%M:%S"),
-                        'Alarm Description': alarm_info.get('description', 'Unknown'),
-                        'Recovery Time': recovery_time.strftime("%H:%M:%S"),
-                        'Downtime (sec)': round(duration, 2)
-                    })
-
-    summary['total_downtime_sec'] = round(total_downtime, 2)
-    summary['alarms_with_context'] = downtime_incidents
-
-    return summary
@@ -1,71 +1,321 @@
 # app.py
+import io
+import json
+import time
+from datetime import timedelta
 import streamlit as st
 import pandas as pd
-from log_parser import parse_log_file
-from config import CEID_MAP, ALARM_DB
-from analyzer import analyze_data, perform_eda
+from analyzer import get_downtime_incidents, get_job_kpis
+from analysis_worker import AnalysisJob
+from event_index import EventIndex
+from rollups import lazy_rollups
+from analysis_cache import AnalysisCache, content_key, key_digest, member_key
+from event_store import EventStore
+from code_tables import get_tables
+from compressed_input import COMPRESSED_SUFFIXES, list_log_members
+from config import CACHE_DIR, CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, EVENT_STORE_PATH
 
 st.set_page_config(page_title="Hirata Log Analyzer", layout="wide")
 st.title("Hirata Equipment Log Analyzer")
 
+@st.cache_resource
+def get_analysis_cache():
+    return AnalysisCache(max_entries=CACHE_MAX_ENTRIES, disk_dir=CACHE_DIR, max_disk_bytes=CACHE_MAX_BYTES)
+
+@st.cache_resource
+def get_event_store():
+    return EventStore(EVENT_STORE_PATH) if EVENT_STORE_PATH else None
+
+def save_to_history(store: EventStore, uploaded_file, member: str, df: pd.DataFrame, summary: dict, tool: str):
+    # Stored once per file hash; the session flag only spares the lookup on widget reruns.
+    cache_key = upload_key(uploaded_file, member)
+    if st.session_state.get(f"stored_{cache_key}"): return
+    if store.ingest(key_digest(cache_key), df, summary, tool or "default", f"{uploaded_file.name}/{member}" if member else uploaded_file.name):
+        st.sidebar.success(f"Saved to history as tool '{tool or 'default'}'.")
+    st.session_state[f"stored_{cache_key}"] = True
+
+def show_panel_trace(store: EventStore):
+    st.subheader("Panel Traceability")
+    untraced = len(store.untraced_files())
+    if untraced:
+        st.warning(f"{untraced} stored log(s) predate the panel index and are not searched yet.")
+        if st.button("Index them from their stored events (without slot numbers)"):
+            store.backfill_panels()
+            st.rerun()
+    panel_id = st.text_input("Panel ID", placeholder="Where and when was this panel processed?").strip()
+    if not panel_id: return
+    traces = store.trace_panel(panel_id)
+    if not traces:
+        similar = store.search_panels(panel_id)
+        st.info(f"Panel {panel_id} is not in the stored logs." + (f" Panel IDs starting with it: {', '.join(similar)}" if similar else ""))
+        return
+    descriptions = get_tables().alarm_db
+    table = pd.DataFrame(traces)
+    table['alarms'] = [", ".join(descriptions.get(a, {}).get('description', str(a)) for a in ids) for ids in table.pop('alarm_ids')]
+    st.dataframe(table.rename(columns={"tool": "Tool", "log": "Log", "lot_id": "Lot ID", "slot": "Slot", "id_read": "IDRead",
+                                       "loaded_to_tool": "LoadedToTool", "alarms": "Alarms Between"}),
+                 hide_index=True, use_container_width=True)
+
+def show_history(store: EventStore):
+    tools = store.tools()
+    if not tools:
+        st.info("No logs saved to history yet.")
+        return
+    show_panel_trace(store)
+    c1, c2, c3 = st.columns([2, 2, 1])
+    selected_tools = c1.multiselect("Tools", tools, default=tools)
+    date_range = c2.date_input("Date range", value=())
+    bucket = c3.selectbox("Bucket", ["hour", "day", "week", "month"], index=1)
+    start = end = None
+    if len(date_range) == 2: start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+
+    st.subheader("UPH Trend per Tool")
+    jobs = store.uph_trend(selected_tools, start, end)
+    if not jobs.empty:
+        st.line_chart(jobs.pivot_table(index='start', columns='tool', values='uph', aggfunc='mean'))
+    else:
+        st.info("No jobs in this range.")
+
+    st.subheader("Alarm Frequency")
+    alarms = store.alarm_frequency(tools=selected_tools, start=start, end=end, bucket=bucket)
+    if not alarms.empty:
+        top = alarms.groupby('alarm_id')['count'].sum().nlargest(10).index
+        st.bar_chart(alarms[alarms['alarm_id'].isin(top)].pivot_table(index='bucket', columns='alarm_id', values='count', aggfunc='sum', fill_value=0))
+    else:
+        st.success("✅ No alarms in this range.")
+
+    st.subheader("Stored Logs")
+    st.dataframe(store.files(selected_tools).drop(columns=['file_hash']), hide_index=True, use_container_width=True)
+
+def upload_key(uploaded_file, member: str = None) -> str:
+    # Hash each upload once per session; reruns for widget interactions reuse the key. Each archive member gets its own.
+    key_name = f"cache_key_{uploaded_file.file_id}"
+    if key_name not in st.session_state: st.session_state[key_name] = content_key(uploaded_file)
+    return member_key(st.session_state[key_name], member)
+
+def archive_members(uploaded_file) -> list:
+    # Only the zip directory is read; [None] for plain and single-stream compressed uploads.
+    key_name = f"members_{uploaded_file.file_id}"
+    if key_name not in st.session_state: st.session_state[key_name] = list_log_members(io.BytesIO(uploaded_file.getvalue()))
+    return st.session_state[key_name]
+
+def cancel_analysis():
+    running = st.session_state.pop("analysis_job", None)
+    if running: running[1].cancel()
+
+def load_analysis(uploaded_file, member: str = None, collect_performance: bool = False):
+    """The (df, summary, eda) result for this upload (or archive member), or the still-running background AnalysisJob."""
+    cache_key = upload_key(uploaded_file, member)
+    perf_name = f"perf_{cache_key}"
+    # Profile one fresh run per log; later reruns are served from the cache again.
+    profile_run = collect_performance and perf_name not in st.session_state
+    if not profile_run:
+        result = get_analysis_cache().get(cache_key)
+        if result is not None: return result
+
+    running = st.session_state.get("analysis_job")
+    if running is None or running[0] != cache_key:
+        cancel_analysis()  # a different file was uploaded
+        job = AnalysisJob(io.BytesIO(uploaded_file.getvalue()), collect_performance=profile_run, member=member).start()
+        st.session_state["analysis_job"] = running = (cache_key, job)
+    job = running[1]
+    if not job.done: return job
+
+    del st.session_state["analysis_job"]
+    if job.error: raise job.error
+    get_analysis_cache().put(cache_key, job.result)
+    if job.profiler: st.session_state[perf_name] = dict(job.profiler.to_dict(), cprofile=job.profiler.cprofile_summary())
+    return job.result
+
+def show_analysis_progress(job: AnalysisJob, uploaded_file, member: str = None):
+    # Partial results while the worker runs; the script polls by rerunning until the job is done.
+    partial = job.partial()
+    st.progress(job.progress, text=f"Analyzing {uploaded_file.name}: {job.stage} · {partial['bytes_read'] / (1 << 20):.1f} of {job.total_bytes / (1 << 20):.1f} MB")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Events Parsed", f"{partial['events']:,}")
+    c2.metric("Alarms Found", len(partial['alarms']))
+    c3.metric("Lots Seen", len(partial['lot_ids']))
+    if partial['event_counts']:
+        st.subheader("Event Frequency (so far)")
+        st.bar_chart(pd.Series(partial['event_counts'], name="count").sort_values(ascending=False))
+    if partial['alarms']:
+        st.subheader("Alarms (so far)")
+        st.dataframe(pd.DataFrame(partial['alarms'][-100:]), hide_index=True, use_container_width=True)
+    if st.button("Cancel analysis"):
+        cancel_analysis()
+        st.session_state[f"cancelled_{upload_key(uploaded_file, member)}"] = True
+        st.rerun()
+    time.sleep(0.5)
+    st.rerun()
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES)
+def get_rollups(cache_key: str, _df: pd.DataFrame, _index: EventIndex):
+    # Keyed by the upload hash; the leading underscores keep Streamlit from hashing the frame and the
+    # index, which is the one analyze_frame already built (summary.index), not a second copy.
+    return lazy_rollups(_df, _index)
+
+def show_trends(rollups):
+    # Reads only the rollup cube for the chosen granularity; zooming slices the cube, not the events.
+    c1, c2 = st.columns([1, 3])
+    freq = c1.selectbox("Granularity", list(rollups), index=1)
+    cube = rollups[freq]
+    if len(cube) == 0:
+        st.info("No timestamped events to chart.")
+        return
+    first, last = cube.metrics.index[0].to_pydatetime(), cube.metrics.index[-1].to_pydatetime()
+    if first < last:
+        start, end = c2.slider("Zoom", min_value=first, max_value=last, value=(first, last),
+                               step=timedelta(seconds=cube.width_sec), format="YYYY/MM/DD HH:mm")
+        cube = cube.window(start, end)
+
+    st.subheader(f"Panels Loaded and UPH per {freq}")
+    col1, col2 = st.columns(2)
+    col1.bar_chart(cube.metrics['panels_loaded'])
+    col2.line_chart(cube.metrics['uph'])
+    st.subheader(f"Downtime (sec) per {freq}")
+    st.bar_chart(cube.metrics['downtime_sec'])
+    st.subheader(f"Alarms by Level per {freq}")
+    alarms = cube.metrics.filter(like='alarms.')
+    alarms = alarms.loc[:, alarms.sum() > 0]
+    if not alarms.empty: st.bar_chart(alarms.rename(columns=lambda c: c.removeprefix('alarms.')))
+    else: st.success("✅ No alarms in this range.")
+    st.subheader(f"Events per {freq}")
+    top = cube.event_counts.sum().nlargest(8).index
+    st.area_chart(cube.event_counts[top])
+
+EVENT_LOG_COLUMNS = ["timestamp", "EventName", "details.AlarmID", "AlarmDescription", "details.LotID", "details.PanelID",
+                     "details.PanelCount", "details.MagazineID", "details.OperatorID"]
+
+def show_event_log(df: pd.DataFrame, index: EventIndex):
+    # Filtering runs on index positions; only the visible page is copied, formatted and sent to the browser.
+    f1, f2, f3, f4 = st.columns(4)
+    event_names = f1.multiselect("Event", sorted(map(str, index.by_event)))
+    alarm_ids = f2.multiselect("Alarm ID", sorted(index.by_alarm))
+    lot_id = f3.text_input("Lot ID contains")
+    panel_id = f4.text_input("Panel ID contains")
+
+    start = end = None
+    first = pd.Timestamp(index.sorted_timestamps[0]).to_pydatetime().replace(microsecond=0)
+    last = (pd.Timestamp(index.sorted_timestamps[-1]).to_pydatetime() + timedelta(seconds=1)).replace(microsecond=0)
+    time_range = st.slider("Time range", min_value=first, max_value=last, value=(first, last),
+                           step=timedelta(seconds=1), format="YYYY/MM/DD HH:mm:ss")
+    if time_range != (first, last): start, end = time_range
+
+    positions = index.filter_positions(start, end, event_names, alarm_ids, lot_id, panel_id)
+    c1, c2, c3 = st.columns([1, 1, 4])
+    page_size = c1.selectbox("Rows per page", [50, 100, 250, 500], index=1)
+    pages = max(1, -(-len(positions) // page_size))
+    page = c2.number_input("Page", min_value=1, max_value=pages, value=1, key=f"event_log_page_{pages}")
+    c3.caption(f"{len(positions):,} of {len(df):,} events · page {page} of {pages}")
+    if len(positions) == 0:
+        st.info("No events match these filters.")
+        return
+
+    display_cols = [col for col in EVENT_LOG_COLUMNS if col in df.columns]
+    page_df = df.iloc[positions[(page - 1) * page_size:page * page_size]][display_cols]
+    page_df = page_df.assign(timestamp=page_df['timestamp'].dt.strftime('%Y/%m/%d %H:%M:%S'))
+    st.dataframe(page_df.style.format(na_rep='-'), hide_index=True, use_container_width=True)
+
+def show_performance_panel(report: dict):
+    with st.sidebar.expander("Performance"):
+        if not report:
+            st.caption("Enable 'Collect performance data' to time the next analysis.")
+            return
+        stages = pd.DataFrame(report['stages'])
+        stages['stage'] = stages['depth'].map(lambda d: "\u00a0\u00a0" * d) + stages['stage']
+        st.dataframe(stages.drop(columns=['depth']), hide_index=True, use_container_width=True)
+        if report['message_counts']:
+            st.write("**Messages by type**")
+            st.dataframe(pd.Series(report['message_counts'], name="count").sort_values(ascending=False), use_container_width=True)
+        if report.get('max_rss_mb'): st.caption(f"Peak process RSS: {report['max_rss_mb']:.1f} MB")
+        st.download_button("Download JSON", json.dumps({k: v for k, v in report.items() if k != 'cprofile'}, indent=1),
+                           file_name="performance.json", mime="application/json")
+        if report.get('cprofile'): st.download_button("Download cProfile summary", report['cprofile'], file_name="cprofile.txt")
+
 with st.sidebar:
     st.title("🤖 Log Analyzer")
-    uploaded_file = st.file_uploader("Upload Hirata Log File", type=['txt', 'log'])
+    uploaded_file = st.file_uploader("Upload Hirata Log File", type=['txt', 'log'] + [s.lstrip('.') for s in COMPRESSED_SUFFIXES])
     st.info("This tool provides engineering analysis of Hirata SECS/GEM logs.")
+    collect_performance = st.checkbox("Collect performance data", help="Time each parse/analysis stage for the next analysis of this log.")
+    event_store = get_event_store()
+    if event_store:
+        tool_name = st.text_input("Tool", value="default", help="Tool this log belongs to, for the History tab.")
+        save_history = st.checkbox("Save to history", value=False,
+                                   help="Stores each analyzed log; this computes its job, downtime and panel sections up front.")
 
-if uploaded_file:
-    with st.spinner("Analyzing log file..."):
-        parsed_events = parse_log_file(uploaded_file)
-        df = pd.json_normalize(parsed_events)
-
-        if 'details.CEID' in df.columns:
-            df['EventName'] = pd.to_numeric(df['details.CEID'], errors='coerce').map(CEID_MAP)
-            if 'details.RCMD' in df.columns:
-                df['EventName'].fillna(df['details.RCMD'], inplace=True)
-            df['EventName'].fillna("Unknown", inplace=True)
-        else:
-            df['EventName'] = "Unknown"
+    member = None
+    if uploaded_file:
+        members = archive_members(uploaded_file)
+        if not members: st.error(f"{uploaded_file.name} contains no log files.")
+        elif len(members) > 1: member = st.selectbox("Log in archive", members)
 
-        if 'details.AlarmID' in df.columns:
-            df['AlarmDescription'] = pd.to_numeric(df['details.AlarmID'], errors='coerce').map(
-                {k: v.get('description', 'Unknown') for k, v in ALARM_DB.items()}
-            ).fillna('')
-        
-        summary = analyze_data(df)
-        eda_results = perform_eda(df)
+if uploaded_file and st.session_state.get(f"cancelled_{upload_key(uploaded_file, member)}"):
+    st.warning(f"Analysis of {uploaded_file.name} was cancelled.")
+    if st.button("Restart analysis"):
+        del st.session_state[f"cancelled_{upload_key(uploaded_file, member)}"]
+        st.rerun()
+elif uploaded_file:
+    analysis = load_analysis(uploaded_file, member, collect_performance)
+    if isinstance(analysis, AnalysisJob): show_analysis_progress(analysis, uploaded_file, member)
+    df, summary, eda_results = analysis
+    show_performance_panel(st.session_state.get(f"perf_{upload_key(uploaded_file, member)}"))
+    if event_store and save_history: save_to_history(event_store, uploaded_file, member, df, summary, tool_name)
 
-    tab1, tab2 = st.tabs(["Main Dashboard", "Process Details"])
+    # Only the selected view's code runs, so summary/EDA sections are computed when first shown (st.tabs runs every tab).
+    view = st.radio("View", ["Main Dashboard", "Process Details", "Trends"] + (["History"] if event_store else []),
+                    horizontal=True, label_visibility="collapsed")
+    # Job segmentation is only computed for the two views that use it.
+    jobs = summary['job_details']['jobs'] if view in ("Main Dashboard", "Process Details") else None
+    selected_job = None
+    if jobs is not None and len(jobs) > 1:
+        job_labels = ["Whole log"] + [f"Job {job} · {lot} · {status}" for job, lot, status in zip(jobs['Job'], jobs['Lot ID'], jobs['Status'])]
+        choice = st.selectbox(f"Job ({len(jobs)} found)", range(len(job_labels)), format_func=job_labels.__getitem__, key="selected_job")
+        if choice: selected_job = jobs.iloc[choice - 1]
 
-    with tab1:
+    if view == "Main Dashboard":
         st.header("Job Performance Dashboard")
         st.markdown("---")
         
-        processing_time = summary['cycle_time_details']['total_processing_time_sec']
-        panel_count = summary['panel_count']
-        
-        avg_cycle_time = (processing_time / panel_count) if panel_count > 0 else 0
-        uph = (panel_count / processing_time * 3600) if processing_time > 0 else 0
+        if selected_job is None:
+            kpis = get_job_kpis(summary)
+            processing_time, panel_count = kpis['total_processing_time_sec'], kpis['panel_count']
+            avg_cycle_time, uph, downtime = kpis['avg_cycle_time_sec'], kpis['uph'], kpis['total_downtime_sec']
+        else:
+            processing_time, panel_count = selected_job['Processing Time (sec)'], int(selected_job['Panels'])
+            avg_cycle_time, uph, downtime = selected_job['Avg. Cycle Time (sec)'], selected_job['UPH'], selected_job['Downtime (sec)']
         
         c1, c2, c3, c4, c5 = st.columns(5)
         c1.metric("Total Processing Time (sec)", f"{processing_time:.2f}")
-        c2.metric("Total Downtime (sec)", f"{summary['total_downtime_sec']:.2f}")
+        c2.metric("Total Downtime (sec)", f"{downtime:.2f}")
         c3.metric("Total Panels Processed", panel_count)
         c4.metric("Avg. Cycle Time (sec)", f"{avg_cycle_time:.2f}")
         c5.metric("Units Per Hour (UPH)", f"{uph:.1f}")
 
         st.markdown("---")
         
-        st.subheader("Downtime Analysis")
-        if summary['alarms_with_context']:
-            st.dataframe(pd.DataFrame(summary['alarms_with_context']), hide_index=True, use_container_width=True)
+        if selected_job is None:
+            st.subheader("Downtime Analysis")
+            incidents = summary['alarms_with_context']
+        else:
+            st.subheader(f"Downtime Analysis · Job {selected_job['Job']}")
+            incidents = get_downtime_incidents(df, summary.index, int(selected_job['Job']))[0]
+        if incidents:
+            st.dataframe(pd.DataFrame(incidents), hide_index=True, use_container_width=True)
         else:
             st.success("✅ No Downtime Incidents Found")
 
-    with tab2:
+        if len(jobs) > 1:
+            st.markdown("---")
+            st.subheader("Jobs")
+            st.dataframe(jobs, hide_index=True, use_container_width=True)
+
+    elif view == "Process Details":
         st.header("Process Details")
         st.markdown("---")
 
-        st.subheader("Magazine Mapping Performance")
+        # Only the cycle-time chart follows the job selector; the mapping and panel sections cover the whole log.
+        scope = " (whole log)" if selected_job is not None else ""
+        st.subheader("Magazine Mapping Performance" + scope)
         c1, c2, c3 = st.columns(3)
         c1.metric("Mapping Start Time", summary['mapping_details']['start_time'])
         c2.metric("Mapping End Time", summary['mapping_details']['end_time'])
@@ -73,7 +323,7 @@ if uploaded_file:
         
         st.markdown("---")
 
-        st.subheader("Panel & Slot Details")
+        st.subheader("Panel & Slot Details" + scope)
         col1, col2 = st.columns([1, 2])
         with col1:
             st.write("**Unique Panel IDs Found**")
@@ -90,7 +340,7 @@ if uploaded_file:
 
         st.markdown("---")
         
-        st.subheader("Lot to Panel ID Mapping")
+        st.subheader("Lot to Panel ID Mapping" + scope)
         if summary['lot_to_panel_map']:
             for lot_id, panel_ids in summary['lot_to_panel_map'].items():
                 st.write(f"**Lot ID:** `{lot_id}`")
@@ -101,12 +351,25 @@ if uploaded_file:
         st.markdown("---")
 
         st.subheader("Cycle Time per Panel")
-        if not summary['cycle_time_details']['cycle_times'].empty:
+        if selected_job is not None:
+            job_cycles = summary['job_details']['cycle_times']
+            job_cycles = job_cycles[job_cycles['Job'] == selected_job['Job']].set_index('Panel Index')[['Cycle Time (sec)']]
+            st.caption(f"Job {selected_job['Job']} ({selected_job['Lot ID']})")
+            st.line_chart(job_cycles)
+        elif not summary['cycle_time_details']['cycle_times'].empty:
             st.line_chart(summary['cycle_time_details']['cycle_times'])
         else:
             st.info("No cycle time data to display.")
+
+    elif view == "Trends":
+        st.header("Trends")
+        show_trends(get_rollups(upload_key(uploaded_file, member), df, summary.index))
+
+    elif view == "History":
+        st.header("History Across Logs")
+        show_history(event_store)
     
-    with st.expander("Show Full Log Exploratory Data Analysis (EDA)"):
+    if st.toggle("Show Full Log Exploratory Data Analysis (EDA)"):
         st.subheader("Event Frequency (Entire Log)")
         if not eda_results['event_counts'].empty:
             st.bar_chart(eda_results['event_counts'])
@@ -124,14 +387,12 @@ if uploaded_file:
 
     st.header("Detailed Event Log")
     if not df.empty:
-        cols = ["timestamp", "EventName", "details.AlarmID", "AlarmDescription", "details.LotID", "details.PanelCount", "details.MagazineID", "details.OperatorID"]
-        display_cols = [col for col in cols if col in df.columns]
-
-        display_df = df[display_cols].copy()
-        display_df['timestamp'] = pd.to_datetime(display_df['timestamp']).dt.strftime('%Y/%m/%d %H:%M:%S')
-
-        st.dataframe(display_df.style.format(na_rep='-'), hide_index=True, use_container_width=True)
+        show_event_log(df, summary.index)
     else:
         st.warning("No meaningful events were found.")
 else:
+    cancel_analysis()
     st.title("Welcome"); st.info("⬅️ Please upload a log file to begin.")
+    if event_store:
+        st.header("History Across Logs")
+        show_history(event_store)
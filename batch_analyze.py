@@ -0,0 +1,184 @@
+# batch_analyze.py
+"""
+Headless batch analysis of many log files across a pool of worker processes.
+
+    python batch_analyze.py /data/logs "/archive/*/2024-05-*.log" -o reports --workers 8 --timeout 600
+
+Writes a per-file summary table, a fleet report and a manifest of processed
+file hashes; files whose hash is already in the manifest are skipped on later runs.
+Compressed logs (.gz, .bz2, .zst) and zip archives are read directly; each log in
+an archive is analyzed, summarized and stored on its own.
+The tool name of a log is the name of its parent directory. With --store the
+parsed events are also saved to the persistent event store (see event_store.py).
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+import pandas as pd
+from analysis_cache import content_key, key_digest, member_key
+from analyzer import get_job_kpis
+from compressed_input import COMPRESSED_SUFFIXES, list_log_members
+from pipeline import run_analysis
+from event_store import EventStore
+
+LOG_SUFFIXES = ('.log', '.txt') + COMPRESSED_SUFFIXES
+MANIFEST_NAME = "manifest.json"
+
+def find_log_files(inputs: list) -> list:
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                paths.extend(os.path.join(root, n) for n in names if n.lower().endswith(LOG_SUFFIXES))
+        else:
+            paths.extend(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+    return sorted(set(os.path.abspath(p) for p in paths))
+
+def log_name(path: str, member: str = None) -> str:
+    return f"{os.path.basename(path)}/{member}" if member else os.path.basename(path)
+
+def summarize_file(path: str, member: str = None, store_path: str = None, file_hash: str = None) -> dict:
+    started = time.perf_counter()
+    df, summary, eda_results = run_analysis(path, member)
+    if store_path:
+        store = EventStore(store_path)
+        # A log stored before the panel index existed is only added to it (e.g. on a --force run).
+        if not store.ingest(file_hash, df, summary, os.path.basename(os.path.dirname(path)), log_name(path, member)) and not store.is_traced(file_hash):
+            store.reindex_file(file_hash, df)
+    row = {
+        "events": len(df), "lot_id": str(summary['lot_id']), "job_status": summary['job_status'],
+        **get_job_kpis(summary),
+        "downtime_incidents": len(summary['alarms_with_context']),
+        "alarm_events": int(eda_results['alarm_counts'].sum()) if not eda_results['alarm_counts'].empty else 0,
+        "mapping_duration_sec": summary['mapping_details'].get('duration_sec', 0.0),
+        "alarm_counts": {str(k): int(v) for k, v in eda_results['alarm_counts'].items()},
+    }
+    row["seconds"] = round(time.perf_counter() - started, 3)
+    return row
+
+def _worker(task: tuple, conn, options: dict):
+    try: conn.send(("ok", summarize_file(*task, **options)))
+    except Exception as exc: conn.send(("error", f"{type(exc).__name__}: {exc}"))
+    finally: conn.close()
+
+def run_pool(tasks: list, workers: int, timeout: float = None, options: dict = None):
+    """
+    Yields (task, status, result) as logs finish; a log over its timeout is killed and reported.
+    A task is a (path, archive member or None) pair; options maps a task to extra summarize_file keyword arguments.
+    """
+    context = multiprocessing.get_context()
+    queue, running = list(reversed(tasks)), {}
+    while queue or running:
+        while queue and len(running) < workers:
+            task = queue.pop()
+            parent_conn, child_conn = context.Pipe(duplex=False)
+            process = context.Process(target=_worker, args=(task, child_conn, (options or {}).get(task, {})), daemon=True)
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (task, process, time.monotonic())
+        for conn in wait(list(running), timeout=0.5):
+            task, process, _ = running.pop(conn)
+            try: status, result = conn.recv()
+            except EOFError: status, result = "error", f"worker exited with code {process.exitcode}"
+            conn.close(); process.join()
+            yield task, status, result
+        if timeout:
+            now = time.monotonic()
+            for conn, (task, process, started) in list(running.items()):
+                if now - started > timeout:
+                    process.terminate(); process.join()
+                    conn.close(); del running[conn]
+                    yield task, "timeout", f"exceeded {timeout:g}s"
+
+def load_manifest(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(output_dir: str, manifest: dict):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + ".tmp", 'w') as f: json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def write_table(df: pd.DataFrame, output_dir: str, name: str, fmt: str) -> str:
+    path = os.path.join(output_dir, f"{name}.{fmt}")
+    if fmt == 'csv': df.to_csv(path, index=False)
+    elif fmt == 'json': df.to_json(path, orient='records', indent=1)
+    elif fmt == 'parquet': df.to_parquet(path, index=False)  # needs pyarrow or fastparquet
+    return path
+
+def build_fleet_report(rows: list) -> tuple:
+    done = [r for r in rows if r.get('status') == 'ok']
+    per_tool = {}
+    for r in done:
+        tool = per_tool.setdefault(r['tool'], {"files": 0, "panels": 0, "processing_time_sec": 0.0, "downtime_sec": 0.0, "downtime_incidents": 0})
+        tool["files"] += 1
+        tool["panels"] += r['panel_count']
+        tool["processing_time_sec"] += r['total_processing_time_sec']
+        tool["downtime_sec"] += r['total_downtime_sec']
+        tool["downtime_incidents"] += r['downtime_incidents']
+    for tool in per_tool.values():
+        tool["downtime_sec"] = round(tool["downtime_sec"], 2)
+        tool["uph"] = (tool["panels"] / tool["processing_time_sec"] * 3600) if tool["processing_time_sec"] > 0 else 0
+    alarm_rows = [{"tool": r['tool'], "Alarm Description": k, "count": v} for r in done for k, v in r.get('alarm_counts', {}).items()]
+    alarms = pd.DataFrame(alarm_rows, columns=["tool", "Alarm Description", "count"])
+    report = {
+        "files": len(rows), "succeeded": len(done), "failed": len(rows) - len(done),
+        "panels": sum(t["panels"] for t in per_tool.values()),
+        "downtime_sec": round(sum(t["downtime_sec"] for t in per_tool.values()), 2),
+        "tools": per_tool,
+    }
+    return report, alarms
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze directories or globs of Hirata logs in parallel.")
+    parser.add_argument("inputs", nargs="+", help="log directories (searched recursively) or glob patterns")
+    parser.add_argument("-o", "--output", default="batch_reports", help="directory for reports and the manifest")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=None, help="per-file limit in seconds")
+    parser.add_argument("--format", choices=["csv", "json", "parquet"], default="csv")
+    parser.add_argument("--force", action="store_true", help="re-analyze the given files even if they are in the manifest (also adds stored logs missing from the panel index)")
+    parser.add_argument("--store", help="SQLite event store to save parsed events into (files already stored are not duplicated)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    # --force re-queues only this run's inputs; entries for other files stay in the fleet report.
+    manifest = load_manifest(args.output)
+    todo, keys = [], {}
+    for path in find_log_files(args.inputs):
+        # Each log of a multi-log archive is its own task, manifest entry and summary row.
+        with open(path, 'rb') as f: file_key, members = content_key(f), list_log_members(f)
+        for member in (members if len(members) > 1 else [None]):
+            task, key = (path, member), member_key(file_key, member)
+            label = os.path.join(path, member) if member else path
+            if not args.force and manifest.get(key, {}).get('status') == 'ok':
+                print(f"{'skip':<7} {label}"); continue
+            keys[task] = key
+            todo.append(task)
+
+    if args.store: EventStore(args.store)  # create the schema once, before workers write concurrently
+    options = {task: {"store_path": args.store, "file_hash": key_digest(keys[task])} for task in todo} if args.store else None
+    for task, status, result in run_pool(todo, max(args.workers, 1), args.timeout, options):
+        path, member = task
+        label = os.path.join(path, member) if member else path
+        row = {"file": path, "member": member, "tool": os.path.basename(os.path.dirname(path)), "content_key": keys[task], "status": status}
+        if status == "ok": row.update(result)
+        else: row["error"] = result
+        manifest[keys[task]] = row
+        save_manifest(args.output, manifest)
+        print(f"{status:<7} {label}" + ("" if status == "ok" else f" ({result})"))
+
+    rows = list(manifest.values())
+    summary_df = pd.DataFrame([{k: v for k, v in r.items() if k != 'alarm_counts'} for r in rows])
+    report, alarms = build_fleet_report(rows)
+    with open(os.path.join(args.output, "fleet_report.json"), 'w') as f: json.dump(report, f, indent=1)
+    print(write_table(summary_df, args.output, "file_summary", args.format))
+    print(write_table(alarms, args.output, "fleet_alarms", args.format))
+
+if __name__ == "__main__":
+    main()
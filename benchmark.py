@@ -0,0 +1,116 @@
+# benchmark.py
+"""
+Stage-by-stage benchmark of the parse/analysis pipeline on synthetic logs.
+
+    python benchmark.py --sizes 10MB 100MB 1GB --output bench_results.json
+    python benchmark.py --sizes 10MB --memory --compare bench_results.json
+    python benchmark.py --sizes 500MB --workers 8
+
+Inputs are generated once per size/seed into --workdir and reused. Each stage
+reports wall time, output rows and, with --memory, the tracemalloc peak
+(tracing slows the stages down, so compare timings only between runs with the same setting).
+parse_parallel covers parse_mmap + frame + event_names split across --workers processes
+(capped at the core count); its peak memory counts only the parent process.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from log_generator import parse_size, write_log
+from log_parser import iter_log_events, iter_log_events_mmap, PARSER_VERSION
+from config import PARSE_WORKERS
+from event_table import collect_columns, add_event_names, parse_log_frame_parallel
+from parallel_parser import worker_count
+from event_index import EventIndex
+from analyzer import analyze_data, perform_eda
+try: import resource  # not available on Windows
+except ImportError: resource = None
+
+def _rows(result) -> int:
+    # Frames report their length; EventColumns and EventIndex expose their row count as .size.
+    if isinstance(result, pd.DataFrame): return len(result)
+    return getattr(result, 'size', 0)
+
+def run_stage(name: str, func, trace_memory: bool, rows: int = None) -> tuple:
+    if trace_memory: tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    stats = {"seconds": round(time.perf_counter() - started, 4), "rows": _rows(result) if rows is None else rows}
+    if trace_memory:
+        stats["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 1)
+        tracemalloc.stop()
+    print(f"  {name:<14} {stats['seconds']:>9.3f}s  rows={stats['rows']:,}" + (f"  peak={stats['peak_mb']}MB" if trace_memory else ""))
+    return result, stats
+
+def benchmark_file(path: str, trace_memory: bool, workers: int = None) -> dict:
+    stages = {}
+    def stage(name, func, rows=None):
+        result, stages[name] = run_stage(name, func, trace_memory, rows)
+        return result
+
+    with open(path, 'rb') as f:
+        stage("parse_stream", lambda: collect_columns(iter_log_events(f)))
+    columns = stage("parse_mmap", lambda: collect_columns(iter_log_events_mmap(path)))
+    raw = stage("frame", columns.to_raw_frame)
+    del columns
+    df = stage("event_names", lambda: add_event_names(raw))
+    stage("parse_parallel", lambda: parse_log_frame_parallel(path, workers))
+    index = stage("event_index", lambda: EventIndex(df))
+    stage("analyze_data", lambda: analyze_data(df, index), len(df))
+    stage("perform_eda", lambda: perform_eda(df, index), len(df))
+    return {"events": len(df), "frame_mb": round(df.memory_usage(deep=True).sum() / (1 << 20), 1), "stages": stages}
+
+def ensure_input(workdir: str, size: str, seed: int) -> str:
+    path = os.path.join(workdir, f"synthetic_{size.lower()}_seed{seed}.log")
+    if not os.path.exists(path):
+        print(f"generating {path}")
+        write_log(path, parse_size(size), seed=seed)
+    return path
+
+def compare(current: dict, baseline: dict):
+    previous = {(r['size'], name): s['seconds'] for r in baseline.get('runs', []) for name, s in r['stages'].items()}
+    print("\nstage timings vs baseline (ratio < 1 is faster):")
+    for run in current['runs']:
+        for name, stats in run['stages'].items():
+            before = previous.get((run['size'], name))
+            if before: print(f"  {run['size']:>6} {name:<14} {before:>9.3f}s -> {stats['seconds']:>9.3f}s  x{stats['seconds'] / before:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each pipeline stage on synthetic logs.")
+    parser.add_argument("--sizes", nargs="+", default=["10MB", "100MB", "1GB"])
+    parser.add_argument("--workdir", default="bench_data", help="where generated logs are kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true", help="trace peak Python memory per stage")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="processes for the parse_parallel stage")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec='seconds'), "python": platform.python_version(),
+            "pandas": pd.__version__, "numpy": np.__version__, "machine": platform.machine(),
+            "cpus": os.cpu_count(), "parse_workers": worker_count(args.workers), "parser_version": PARSER_VERSION, "memory_traced": args.memory,
+        },
+        "runs": [],
+    }
+    for size in args.sizes:
+        path = ensure_input(args.workdir, size, args.seed)
+        print(f"{size}: {path}")
+        run = {"size": size, "bytes": os.path.getsize(path), **benchmark_file(path, args.memory, args.workers)}
+        results["runs"].append(run)
+    if resource: results["meta"]["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    with open(args.output, 'w') as f: json.dump(results, f, indent=1)
+    print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f: compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
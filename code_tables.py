@@ -0,0 +1,172 @@
+# code_tables.py
+"""
+CEID / RPTID / alarm tables compiled into dense NumPy lookup arrays
+(sorted-id tables searched with searchsorted when the ids are too large for that).
+
+The built-in tables come from config.py. Setting LOG_ANALYZER_TOOL_MODEL
+instead loads <model>.yaml / <model>.yml, or a <model>/ directory of CSVs,
+from LOG_ANALYZER_TABLES_DIR:
+
+    ceids.csv   ceid,name
+    rptids.csv  rptid,fields            (fields separated by ';')
+    alarms.csv  alarm_id,description,level
+
+A YAML file uses the keys ceids, rptids and alarms with the same shapes as
+config.py. Tables missing from a model fall back to the built-in ones.
+When LOG_ANALYZER_TABLES_CACHE_DIR (or LOG_ANALYZER_CACHE_DIR) is set, the
+compiled tables are pickled there, keyed by a hash of their contents.
+"""
+import csv
+import functools
+import hashlib
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from config import ALARM_DB, CEID_MAP, RPTID_MAP, CODE_TABLES_DIR, CODE_TABLES_CACHE_DIR, TOOL_MODEL
+try: import yaml  # only needed for YAML tool tables
+except ImportError: yaml = None
+
+LEVELS = ('Unknown', 'Warning', 'Alarm', 'Error')
+STOPPABLE_LEVELS = ('Error', 'Alarm')
+# Bump whenever the compiled layout changes so cached pickles are rebuilt.
+COMPILED_VERSION = "2"
+# Ids below this are looked up in an array indexed by id; a table with a larger id (U4 CEIDs and
+# ALIDs can reach 4e9) keeps its ids sorted instead, so it never allocates one slot per possible id.
+MAX_DENSE_ID = 1 << 16
+
+def _dense(keys, values, fill, dtype):
+    """An array indexed by id, or a (sorted ids, values) pair when an id is MAX_DENSE_ID or more."""
+    keys = np.fromiter(keys, dtype=np.int64, count=len(keys))
+    values = np.broadcast_to(np.asarray(values, dtype=dtype), keys.shape)
+    if len(keys) and keys.max() >= MAX_DENSE_ID:
+        order = np.argsort(keys, kind='stable')
+        return keys[order], values[order]
+    array = np.full(keys.max() + 1 if len(keys) else 0, fill, dtype=dtype)
+    array[keys] = values
+    return array
+
+def _table_ids(table) -> np.ndarray:
+    # Ids whose entry in a boolean table is set.
+    return table[0][table[1]] if isinstance(table, tuple) else np.flatnonzero(table)
+
+def _lookup(table, ids, fill):
+    # ids may be an Int64 Series with <NA>, a float array with NaN or plain ints; missing or unknown ids map to fill.
+    ids = ids.to_numpy(dtype='float64', na_value=np.nan) if isinstance(ids, pd.Series) else np.asarray(ids, dtype='float64')
+    if isinstance(table, tuple):
+        keys, values = table
+        out = np.full(len(ids), fill, dtype=values.dtype)
+        if not len(keys): return out
+        positions = np.minimum(np.searchsorted(keys, ids), len(keys) - 1)  # NaN sorts last and never matches
+        found = keys[positions] == ids
+        out[found] = values[positions[found]]
+        return out
+    valid = (ids >= 0) & (ids < len(table))
+    out = np.full(len(ids), fill, dtype=table.dtype)
+    out[valid] = table[ids[valid].astype(np.intp)]
+    return out
+
+class CodeTables:
+    def __init__(self, ceid_map: dict, rptid_map: dict, alarm_db: dict):
+        self.ceid_map = {int(k): str(v) for k, v in ceid_map.items()}
+        self.rptid_map = {int(k): list(v) for k, v in rptid_map.items()}
+        self.alarm_db = {int(k): dict(v) for k, v in alarm_db.items()}
+        self.fingerprint = hashlib.blake2b(repr((self.ceid_map, self.rptid_map, self.alarm_db)).encode(), digest_size=8).hexdigest()
+        self.alarm_ceids = frozenset(k for k, v in self.ceid_map.items() if "Alarm" in v)
+
+        # Event names: CEID -> code into event_categories, -1 when the CEID is not mapped.
+        self.event_categories = pd.Index(sorted(set(self.ceid_map.values())))
+        self.ceid_codes = _dense(list(self.ceid_map), self.event_categories.get_indexer(list(self.ceid_map.values())), -1, np.int32)
+        self.rptid_known = _dense(list(self.rptid_map), True, False, bool)
+
+        # Alarms: level enum, stoppable mask and description codes (code 0 is '' for unknown alarms).
+        alarm_ids = list(self.alarm_db)
+        levels = [v.get('level') for v in self.alarm_db.values()]
+        self.alarm_levels = _dense(alarm_ids, [LEVELS.index(l) if l in LEVELS else 0 for l in levels], 0, np.int8)
+        self.stoppable_mask = _dense(alarm_ids, [l in STOPPABLE_LEVELS for l in levels], False, bool)
+        descriptions = [v.get('description', 'Unknown') for v in self.alarm_db.values()]
+        self.description_categories = pd.Index([''] + sorted(set(descriptions) - {''}))
+        self.description_codes = _dense(alarm_ids, self.description_categories.get_indexer(descriptions), 0, np.int32)
+
+    def stoppable_codes(self) -> frozenset:
+        return frozenset(_table_ids(self.stoppable_mask).tolist())
+
+    def event_name(self, ceid) -> str:
+        return self.ceid_map.get(ceid)
+
+    def event_names(self, ceids, fallback: pd.Series = None) -> pd.Categorical:
+        """EventName per row: the CEID's name, else the fallback (RCMD), else "Unknown"."""
+        codes = _lookup(self.ceid_codes, ceids, -1)
+        categories = list(self.event_categories)
+        missing = codes < 0
+        if missing.any():
+            values = fallback[missing].fillna("Unknown") if fallback is not None else pd.Series("Unknown", index=range(missing.sum()))
+            extra_codes, extra = pd.factorize(values.astype('object'))
+            positions = {name: i for i, name in enumerate(categories)}
+            for name in extra:
+                if name not in positions: positions[name] = len(categories); categories.append(name)
+            codes[missing] = np.array([positions[name] for name in extra], dtype=codes.dtype)[extra_codes]
+        names = pd.Categorical.from_codes(codes, categories).remove_unused_categories()
+        return names.reorder_categories(sorted(names.categories))
+
+    def alarm_descriptions(self, alarm_ids) -> pd.Categorical:
+        names = pd.Categorical.from_codes(_lookup(self.description_codes, alarm_ids, 0), self.description_categories)
+        return names.remove_unused_categories()
+
+    def alarm_level_codes(self, alarm_ids) -> np.ndarray:
+        return _lookup(self.alarm_levels, alarm_ids, 0)
+
+    def is_stoppable(self, alarm_ids) -> np.ndarray:
+        return _lookup(self.stoppable_mask, alarm_ids, False)
+
+def _read_csv(path: str) -> list:
+    with open(path, newline='', encoding='utf-8') as f:
+        return [{k.strip(): (v or '').strip() for k, v in row.items() if k} for row in csv.DictReader(f)]
+
+def _read_model_dir(path: str) -> dict:
+    tables = {}
+    if os.path.exists(os.path.join(path, 'ceids.csv')):
+        tables['ceids'] = {int(r['ceid']): r['name'] for r in _read_csv(os.path.join(path, 'ceids.csv'))}
+    if os.path.exists(os.path.join(path, 'rptids.csv')):
+        tables['rptids'] = {int(r['rptid']): [f.strip() for f in r['fields'].split(';') if f.strip()] for r in _read_csv(os.path.join(path, 'rptids.csv'))}
+    if os.path.exists(os.path.join(path, 'alarms.csv')):
+        tables['alarms'] = {int(r['alarm_id']): {'description': r.get('description') or 'Unknown', 'level': r.get('level') or 'Unknown'}
+                            for r in _read_csv(os.path.join(path, 'alarms.csv'))}
+    return tables
+
+def _read_model_yaml(path: str) -> dict:
+    if yaml is None: raise ImportError(f"PyYAML is required to load {path}")
+    with open(path, encoding='utf-8') as f: return yaml.safe_load(f) or {}
+
+def model_source(model: str, tables_dir: str = CODE_TABLES_DIR) -> str:
+    for candidate in (f"{model}.yaml", f"{model}.yml", model):
+        path = os.path.join(tables_dir, candidate)
+        if os.path.exists(path): return path
+    raise FileNotFoundError(f"no code tables for tool model '{model}' in {tables_dir}")
+
+def load_source(path: str) -> dict:
+    tables = _read_model_dir(path) if os.path.isdir(path) else _read_model_yaml(path)
+    return {'ceid_map': tables.get('ceids') or CEID_MAP, 'rptid_map': tables.get('rptids') or RPTID_MAP, 'alarm_db': tables.get('alarms') or ALARM_DB}
+
+def compile_tables(ceid_map: dict, rptid_map: dict, alarm_db: dict, cache_dir: str = CODE_TABLES_CACHE_DIR) -> CodeTables:
+    if not cache_dir: return CodeTables(ceid_map, rptid_map, alarm_db)
+    key = hashlib.blake2b(repr((COMPILED_VERSION, ceid_map, rptid_map, alarm_db)).encode(), digest_size=12).hexdigest()
+    path = os.path.join(cache_dir, f"code_tables-{key}.pkl")
+    try:
+        with open(path, 'rb') as f: return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError): pass
+    tables = CodeTables(ceid_map, rptid_map, alarm_db)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f: pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return tables
+
+@functools.lru_cache(maxsize=None)
+def load_tables(model: str = None) -> CodeTables:
+    if not model: return compile_tables(CEID_MAP, RPTID_MAP, ALARM_DB)
+    return compile_tables(**load_source(model_source(model)))
+
+def get_tables() -> CodeTables:
+    """Compiled tables for the configured tool model (LOG_ANALYZER_TOOL_MODEL), built once per process."""
+    return load_tables(TOOL_MODEL)
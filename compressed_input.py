@@ -0,0 +1,71 @@
+# compressed_input.py
+"""
+Streamed decompression of archived logs (.gz, .bz2, .zst, .zip).
+The format is detected from the leading magic bytes, and data is decompressed
+chunk by chunk as the parser reads it; the decompressed text is never held in
+memory as a whole. A zip archive can hold several logs, including compressed ones.
+.zst needs the optional 'zstandard' package.
+"""
+import bz2
+import gzip
+import zipfile
+try: import zstandard  # optional, only for .zst input
+except ImportError: zstandard = None
+
+MAGIC_BYTES = ((b"\x1f\x8b", "gz"), (b"BZh", "bz2"), (b"\x28\xb5\x2f\xfd", "zst"), (b"PK\x03\x04", "zip"))
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.zst', '.zip')
+
+def detect_compression(binary_stream) -> str:
+    """'gz', 'bz2', 'zst', 'zip', or None for plain text; reads only the first bytes and rewinds."""
+    if not (hasattr(binary_stream, 'seekable') and binary_stream.seekable()):
+        head = binary_stream.peek(4)[:4] if hasattr(binary_stream, 'peek') else b""
+    else:
+        binary_stream.seek(0)
+        head = binary_stream.read(4)
+        binary_stream.seek(0)
+    return next((kind for magic, kind in MAGIC_BYTES if head.startswith(magic)), None)
+
+def is_compressed_path(path: str) -> bool:
+    with open(path, 'rb') as f: return detect_compression(f) is not None
+
+def open_decompressed(binary_stream, kind: str):
+    if kind == "gz": return gzip.GzipFile(fileobj=binary_stream, mode='rb')
+    if kind == "bz2": return bz2.BZ2File(binary_stream, mode='rb')
+    if kind == "zst":
+        if zstandard is None: raise ImportError("reading .zst logs needs the 'zstandard' package")
+        return zstandard.ZstdDecompressor().stream_reader(binary_stream, read_across_frames=True)
+    raise ValueError(f"not a single-stream compression format: {kind}")
+
+def _archive_members(archive: zipfile.ZipFile) -> list:
+    return sorted(info.filename for info in archive.infolist()
+                  if not info.is_dir() and not info.filename.startswith("__MACOSX/"))
+
+def list_log_members(binary_stream) -> list:
+    """
+    Names of the logs in a zip archive, as iter_log_streams yields them (a zip inside the zip gives
+    'inner.zip/tool.log'); only directories and the first bytes of each member are read.
+    [None] for any other input.
+    """
+    if detect_compression(binary_stream) != "zip": return [None]
+    members = []
+    with zipfile.ZipFile(binary_stream) as archive:
+        for name in _archive_members(archive):
+            with archive.open(name) as member:
+                members.extend(name if inner_name is None else f"{name}/{inner_name}" for inner_name in list_log_members(member))
+    binary_stream.seek(0)
+    return members
+
+def iter_log_streams(binary_stream):
+    """Yields (member name or None, decompressed binary stream) for each log in the input, in name order."""
+    kind = detect_compression(binary_stream)
+    if kind is None:
+        yield None, binary_stream
+    elif kind == "zip":
+        with zipfile.ZipFile(binary_stream) as archive:
+            for name in _archive_members(archive):
+                with archive.open(name) as member:
+                    # Members may themselves be compressed (e.g. tool.log.gz inside a zip).
+                    for inner_name, stream in iter_log_streams(member):
+                        yield name if inner_name is None else f"{name}/{inner_name}", stream
+    else:
+        with open_decompressed(binary_stream, kind) as stream: yield None, stream
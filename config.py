@@ -3,6 +3,41 @@
 Single source of truth for all static configuration data.
 Includes the COMPLETE alarm code mapping from the specification document.
 """
+import os
+
+TIMESTAMP_FORMAT = "%Y/%m/%d %H:%M:%S.%f"
+
+# --- ANALYSIS CACHE ---
+# The on-disk store is only used when LOG_ANALYZER_CACHE_DIR is set.
+CACHE_MAX_ENTRIES = 8
+CACHE_DIR = os.environ.get("LOG_ANALYZER_CACHE_DIR")
+CACHE_MAX_BYTES = int(os.environ.get("LOG_ANALYZER_CACHE_MAX_BYTES", 2 << 30))
+# Persistent cross-log event store (SQLite file); the History tab is shown only when this is set.
+EVENT_STORE_PATH = os.environ.get("LOG_ANALYZER_EVENT_STORE")
+
+# --- PARSING ---
+# Plain local logs at least this large are parsed in chunks on up to PARSE_WORKERS cores (parallel_parser.py).
+PARALLEL_PARSE_MIN_BYTES = int(os.environ.get("LOG_ANALYZER_PARALLEL_PARSE_MIN_BYTES", 256 << 20))
+PARSE_WORKERS = int(os.environ.get("LOG_ANALYZER_PARSE_WORKERS", os.cpu_count() or 1))
+
+# --- ANALYSIS SERVICE ---
+# Local HTTP/JSON service (analysis_service.py); its JSON responses are cached on disk under CACHE_DIR/service.
+SERVICE_HOST = os.environ.get("LOG_ANALYZER_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("LOG_ANALYZER_SERVICE_PORT", 8765))
+SERVICE_WORKERS = int(os.environ.get("LOG_ANALYZER_SERVICE_WORKERS", os.cpu_count() or 1))
+SERVICE_CACHE_ENTRIES = 64
+
+# --- SHIFTS ---
+# Equal-length shifts starting at SHIFT_START_HOUR, used for the per-shift rollups.
+SHIFT_START_HOUR = int(os.environ.get("LOG_ANALYZER_SHIFT_START_HOUR", 6))
+SHIFT_HOURS = int(os.environ.get("LOG_ANALYZER_SHIFT_HOURS", 8))
+
+# --- CODE TABLES ---
+# LOG_ANALYZER_TOOL_MODEL selects external CEID/RPTID/alarm tables from CODE_TABLES_DIR (see code_tables.py);
+# unset, the tables below are used.
+TOOL_MODEL = os.environ.get("LOG_ANALYZER_TOOL_MODEL")
+CODE_TABLES_DIR = os.environ.get("LOG_ANALYZER_TABLES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_tables"))
+CODE_TABLES_CACHE_DIR = os.environ.get("LOG_ANALYZER_TABLES_CACHE_DIR", CACHE_DIR)
 
 CEID_MAP = {
     # GEM Events
@@ -15,8 +50,8 @@ CEID_MAP = {
 
     # Equipment Inherent Events
     120: "IDRead", 121: "UnloadedFromMag", 122: "LoadedToMag", 126: "UnloadedFromTool",
-    127: "LoadedToTool", 128: "PP-Selected", 131: "LoadToToolCompleted", 132: "UnloadFromToolCompleted",
-    133: "MagToMagCompleted", 134: "MagCheckedCompleted", 136: "MappingCompleted",
+    127: "LoadedToTool", 128: "PP-Selected", 130: "LoadStarted", 131: "LoadToToolCompleted",
+    132: "UnloadFromToolCompleted", 133: "MagToMagCompleted", 134: "MagCheckedCompleted", 136: "MappingCompleted",
     141: "PortStatusChange", 151: "MagazineDocked", 180: "RequestMagazineDock",
     181: "MagazineDocked", 182: "MagazineUndocked", 183: "RequestOperatorIdCheck",
     184: "RequestOperatorLogin", 185: "RequestMappingCheck",
@@ -0,0 +1,83 @@
+# event_index.py
+"""
+Row-position index over an event frame, built once and shared by the analyzer
+functions so each EventName/AlarmID slice is a position lookup, not a full-column scan.
+"""
+import numpy as np
+import pandas as pd
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+def _group_positions(keys: pd.Series) -> dict:
+    codes, uniques = pd.factorize(keys, use_na_sentinel=True)
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    # NA rows carry code -1 and sort first; skip them.
+    offset = int((codes < 0).sum())
+    bounds = np.cumsum(counts) + offset
+    groups, start = {}, offset
+    for key, end in zip(uniques, bounds):
+        groups[key] = order[start:end]
+        start = end
+    return groups
+
+class EventIndex:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.size = len(df)
+        self.by_event = _group_positions(df['EventName']) if 'EventName' in df.columns else {}
+        self.by_alarm = {}
+        if 'details.AlarmID' in df.columns:
+            alarm_ids = pd.to_numeric(df['details.AlarmID'], errors='coerce')
+            self.by_alarm = {int(k): v for k, v in _group_positions(alarm_ids).items()}
+        timestamps = df['timestamp'].to_numpy() if 'timestamp' in df.columns else np.empty(0, dtype='datetime64[us]')
+        self.time_order = np.argsort(timestamps, kind='stable')
+        self.sorted_timestamps = timestamps[self.time_order]
+        self._column_groups = {}
+
+    def positions(self, *event_names) -> np.ndarray:
+        found = [self.by_event[name] for name in event_names if name in self.by_event]
+        if not found: return _EMPTY
+        return found[0] if len(found) == 1 else np.sort(np.concatenate(found))
+
+    def alarm_positions(self, alarm_ids) -> np.ndarray:
+        found = [self.by_alarm[a] for a in alarm_ids if a in self.by_alarm]
+        return np.sort(np.concatenate(found)) if found else _EMPTY
+
+    def rows(self, *event_names) -> pd.DataFrame:
+        return self.df.iloc[self.positions(*event_names)]
+
+    def time_range_positions(self, start=None, end=None) -> np.ndarray:
+        # Row positions with start <= timestamp <= end, in time order.
+        lo = 0 if start is None else np.searchsorted(self.sorted_timestamps, np.datetime64(start), side='left')
+        hi = len(self.sorted_timestamps) if end is None else np.searchsorted(self.sorted_timestamps, np.datetime64(end), side='right')
+        return self.time_order[lo:hi]
+
+    def column_groups(self, column: str) -> dict:
+        # Value -> row positions for any other column, built on first use.
+        groups = self._column_groups.get(column)
+        if groups is None:
+            groups = self._column_groups[column] = _group_positions(self.df[column]) if column in self.df.columns else {}
+        return groups
+
+    def matching_positions(self, column: str, text: str) -> np.ndarray:
+        # Rows whose value contains text (case-insensitive); only the distinct values are searched.
+        text = text.strip().lower()
+        found = [pos for value, pos in self.column_groups(column).items() if text in str(value).lower()]
+        return np.sort(np.concatenate(found)) if found else _EMPTY
+
+    def filter_positions(self, start=None, end=None, event_names=None, alarm_ids=None, lot_id: str = None, panel_id: str = None) -> np.ndarray:
+        """Row positions, in log order, matching every given filter; filters left as None/empty are skipped."""
+        selections = []
+        if start is not None or end is not None: selections.append(self.time_range_positions(start, end))
+        if event_names: selections.append(self.positions(*event_names))
+        if alarm_ids: selections.append(self.alarm_positions(alarm_ids))
+        if lot_id: selections.append(self.matching_positions('details.LotID', lot_id))
+        if panel_id: selections.append(self.matching_positions('details.PanelID', panel_id))
+        if not selections: return np.arange(self.size)
+        mask = np.ones(self.size, dtype=bool)
+        for selected in selections:
+            keep = np.zeros(self.size, dtype=bool)
+            keep[selected] = True
+            mask &= keep
+        return np.flatnonzero(mask)
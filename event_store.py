@@ -0,0 +1,238 @@
+# event_store.py
+"""
+Optional persistent event store (embedded SQLite) for questions that span many logs.
+
+    store = EventStore("events.db")
+    store.ingest(file_hash, df, summary, tool="HIRATA-01", name="2024-05-01.log")
+    store.alarm_frequency(alarm_ids=[137], start="2024-05-01", bucket="day")
+    store.uph_trend(tools=["HIRATA-01"])
+    store.trace_panel("P021")    # where and when panel P021 was processed, across all stored logs
+
+Each log is stored once, keyed by the hash of its bytes. Events are indexed on
+(tool, ts), (EventName, ts) and (AlarmID, ts); per-job KPIs live in their own
+table, so trend queries never scan event rows.
+
+The panel traceability index (one row per panel IDRead, see
+analyzer.get_panel_traces) is filled in the same transaction as a log's events,
+and trace_panel lookups use its panel_id index. untraced_files() lists logs that
+were stored before the index existed. reindex_file() rebuilds one of them from
+its parsed frame. backfill_panels() rebuilds all of them from their stored
+events, without slot numbers, since events do not keep them.
+
+Timestamps are stored as integer microseconds since the epoch of the log's
+wall clock.
+"""
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import repeat
+import pandas as pd
+from analyzer import get_job_kpis, get_panel_traces
+
+BUCKETS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m"}
+ALARM_EVENTS = ('Alarm Set', 'AlarmSet')
+EPOCH = datetime(1970, 1, 1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY, file_hash TEXT UNIQUE NOT NULL, tool TEXT NOT NULL, name TEXT, ingested_at TEXT NOT NULL,
+    events INTEGER, first_ts INTEGER, last_ts INTEGER, lot_id TEXT, job_status TEXT,
+    panels INTEGER, processing_time_sec REAL, downtime_sec REAL, uph REAL
+);
+CREATE TABLE IF NOT EXISTS events (
+    file_id INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE, tool TEXT NOT NULL, ts INTEGER NOT NULL,
+    event_name TEXT, ceid INTEGER, alarm_id INTEGER, lot_id TEXT, panel_id TEXT
+);
+CREATE INDEX IF NOT EXISTS events_tool_ts ON events(tool, ts);
+CREATE INDEX IF NOT EXISTS events_name_ts ON events(event_name, ts);
+CREATE INDEX IF NOT EXISTS events_alarm_ts ON events(alarm_id, ts) WHERE alarm_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS events_file ON events(file_id);
+CREATE TABLE IF NOT EXISTS jobs (
+    file_id INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE, tool TEXT NOT NULL, job INTEGER, lot_id TEXT,
+    start_ts INTEGER, end_ts INTEGER, status TEXT, panels INTEGER, processing_time_sec REAL, uph REAL, downtime_sec REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_tool_start ON jobs(tool, start_ts);
+CREATE INDEX IF NOT EXISTS jobs_file ON jobs(file_id);
+CREATE TABLE IF NOT EXISTS panels (
+    panel_id TEXT NOT NULL, file_id INTEGER NOT NULL REFERENCES files(file_id) ON DELETE CASCADE, tool TEXT NOT NULL,
+    lot_id TEXT, slot_id INTEGER, id_read_ts INTEGER, loaded_ts INTEGER, alarm_ids TEXT
+);
+CREATE INDEX IF NOT EXISTS panels_panel ON panels(panel_id, id_read_ts);
+CREATE INDEX IF NOT EXISTS panels_file ON panels(file_id);
+CREATE TABLE IF NOT EXISTS traced_files (file_id INTEGER PRIMARY KEY REFERENCES files(file_id) ON DELETE CASCADE);
+"""
+
+def _micros(value) -> int:
+    return None if value is None or pd.isna(value) else pd.Timestamp(value).value // 1000
+
+def _from_micros(value: int) -> datetime:
+    return None if value is None else EPOCH + timedelta(microseconds=value)
+
+def _insert_panels(conn, file_id: int, tool: str, df: pd.DataFrame):
+    # Replaces the file's panel rows and marks it as traced, even when it has no IDRead at all.
+    traces = get_panel_traces(df)
+    conn.execute("DELETE FROM panels WHERE file_id = ?", (file_id,))
+    conn.executemany("INSERT INTO panels VALUES (?, ?, ?, ?, ?, ?, ?, ?)", zip(
+        traces['Panel ID'].tolist(), repeat(file_id), repeat(tool), _text_values(traces, 'Lot ID'), _values(traces, 'Slot'),
+        traces['IDRead'].to_numpy(dtype='datetime64[us]').astype('int64').tolist(), map(_micros, traces['LoadedToTool']),
+        [",".join(map(str, ids)) for ids in traces['Alarm IDs']]))
+    conn.execute("INSERT OR IGNORE INTO traced_files VALUES (?)", (file_id,))
+
+def _values(df: pd.DataFrame, column: str) -> list:
+    # Plain Python values with None for missing, which is what sqlite3 binds.
+    if column not in df.columns: return [None] * len(df)
+    values = df[column].astype('object')
+    return values.where(values.notna(), None).tolist()
+
+def _text_values(df: pd.DataFrame, column: str) -> list:
+    return [None if v is None else str(v) for v in _values(df, column)]
+
+class EventStore:
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")  # lets batch workers write while the app reads
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            conn.execute("PRAGMA foreign_keys = ON")
+            with conn: yield conn
+        finally:
+            conn.close()
+
+    def has_file(self, file_hash: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM files WHERE file_hash = ?", (file_hash,)).fetchone() is not None
+
+    def ingest(self, file_hash: str, df: pd.DataFrame, summary: dict, tool: str, name: str = None) -> bool:
+        """Stores one analyzed log; returns False when a file with this hash is already stored."""
+        df = df[df['timestamp'].notna()] if 'timestamp' in df.columns else df.iloc[:0]
+        timestamps = (df['timestamp'].to_numpy(dtype='datetime64[us]').astype('int64')).tolist()
+        kpis = get_job_kpis(summary)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO files (file_hash, tool, name, ingested_at, events, first_ts, last_ts, lot_id, job_status, "
+                "panels, processing_time_sec, downtime_sec, uph) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_hash, tool, name, datetime.now().isoformat(timespec='seconds'), len(df),
+                 min(timestamps, default=None), max(timestamps, default=None), str(summary.get('lot_id', "N/A")),
+                 summary.get('job_status'), int(kpis['panel_count']), float(kpis['total_processing_time_sec']),
+                 float(kpis['total_downtime_sec']), float(kpis['uph'])))
+            if cursor.rowcount == 0: return False
+            file_id = cursor.lastrowid
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", zip(
+                repeat(file_id), repeat(tool), timestamps, _text_values(df, 'EventName'), _values(df, 'details.CEID'),
+                _values(df, 'details.AlarmID'), _text_values(df, 'details.LotID'), _text_values(df, 'details.PanelID')))
+
+            jobs = summary.get('job_details', {}).get('jobs', pd.DataFrame())
+            if not jobs.empty:
+                conn.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+                    (file_id, tool, int(job['Job']), None if pd.isna(job['Lot ID']) else str(job['Lot ID']),
+                     _micros(job['Start']), _micros(job['End']), job['Status'], int(job['Panels']),
+                     float(job['Processing Time (sec)']), float(job['UPH']), float(job['Downtime (sec)']))
+                    for job in jobs.to_dict('records')])
+            _insert_panels(conn, file_id, tool, df)
+        return True
+
+    def is_traced(self, file_hash: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM files f JOIN traced_files t ON t.file_id = f.file_id WHERE f.file_hash = ?",
+                                (file_hash,)).fetchone() is not None
+
+    def reindex_file(self, file_hash: str, df: pd.DataFrame) -> bool:
+        """Rebuilds the panel traces of a stored log from its parsed frame; returns False when the file is not stored."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT file_id, tool FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+            if row is None: return False
+            _insert_panels(conn, row[0], row[1], df[df['timestamp'].notna()] if 'timestamp' in df.columns else df.iloc[:0])
+        return True
+
+    def untraced_files(self) -> pd.DataFrame:
+        """Stored logs that are not in the panel index (ingested before it existed)."""
+        return self._query("SELECT file_id, file_hash, tool, name FROM files WHERE file_id NOT IN (SELECT file_id FROM traced_files) "
+                           "AND file_id NOT IN (SELECT file_id FROM panels) ORDER BY first_ts")
+
+    def backfill_panels(self) -> int:
+        """Indexes every untraced log from its stored events (slots stay empty); returns the number of logs indexed."""
+        untraced = self.untraced_files()
+        for file_id, file_hash in zip(untraced['file_id'], untraced['file_hash']):
+            events = self._query("SELECT ts, event_name, alarm_id, lot_id, panel_id FROM events WHERE file_id = ? ORDER BY rowid", [int(file_id)])
+            self.reindex_file(file_hash, pd.DataFrame({
+                'timestamp': pd.to_datetime(events['ts'], unit='us'), 'EventName': events['event_name'],
+                'details.AlarmID': events['alarm_id'].astype('Int64'), 'details.LotID': events['lot_id'], 'details.PanelID': events['panel_id']}))
+        return len(untraced)
+
+    def remove_file(self, file_hash: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM files WHERE file_hash = ?", (file_hash,)).rowcount > 0
+
+    def _query(self, sql: str, params: list = ()) -> pd.DataFrame:
+        with self._connect() as conn: return pd.read_sql_query(sql, conn, params=list(params))
+
+    @staticmethod
+    def _where(tools=None, start=None, end=None, ts_column: str = "ts") -> tuple:
+        clauses, params = [], []
+        if tools:
+            clauses.append(f"tool IN ({', '.join('?' * len(tools))})"); params.extend(tools)
+        if start is not None: clauses.append(f"{ts_column} >= ?"); params.append(_micros(start))
+        if end is not None: clauses.append(f"{ts_column} <= ?"); params.append(_micros(end))
+        return clauses, params
+
+    def tools(self) -> list:
+        return self._query("SELECT DISTINCT tool FROM files ORDER BY tool")['tool'].tolist()
+
+    def files(self, tools: list = None) -> pd.DataFrame:
+        clauses, params = self._where(tools)
+        df = self._query("SELECT file_hash, tool, name, ingested_at, events, first_ts, last_ts, lot_id, job_status, panels, "
+                         "processing_time_sec, downtime_sec, uph FROM files"
+                         + (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY first_ts", params)
+        for column in ('first_ts', 'last_ts'): df[column] = pd.to_datetime(df[column], unit='us')
+        return df
+
+    def _bucketed_counts(self, key: str, extra_clauses: list, extra_params: list, tools, start, end, bucket: str) -> pd.DataFrame:
+        clauses, params = self._where(tools, start, end)
+        clauses, params = extra_clauses + clauses, extra_params + params
+        return self._query(
+            f"SELECT strftime('{BUCKETS[bucket]}', ts / 1000000, 'unixepoch') AS bucket, tool, {key}, COUNT(*) AS count "
+            f"FROM events WHERE {' AND '.join(clauses)} GROUP BY bucket, tool, {key} ORDER BY bucket", params)
+
+    def alarm_frequency(self, alarm_ids: list = None, tools: list = None, start=None, end=None, bucket: str = "day") -> pd.DataFrame:
+        """Alarm Set occurrences per time bucket, tool and AlarmID."""
+        clauses = [f"event_name IN ({', '.join('?' * len(ALARM_EVENTS))})", "alarm_id IS NOT NULL"]
+        params = list(ALARM_EVENTS)
+        if alarm_ids:
+            clauses.append(f"alarm_id IN ({', '.join('?' * len(alarm_ids))})"); params.extend(int(a) for a in alarm_ids)
+        return self._bucketed_counts("alarm_id", clauses, params, tools, start, end, bucket)
+
+    def event_counts(self, event_names: list = None, tools: list = None, start=None, end=None, bucket: str = "day") -> pd.DataFrame:
+        clauses, params = ["event_name IS NOT NULL"], []
+        if event_names:
+            clauses.append(f"event_name IN ({', '.join('?' * len(event_names))})"); params.extend(event_names)
+        return self._bucketed_counts("event_name", clauses, params, tools, start, end, bucket)
+
+    def uph_trend(self, tools: list = None, start=None, end=None) -> pd.DataFrame:
+        """One row per stored job, in start order, with its panels, UPH and downtime."""
+        clauses, params = self._where(tools, start, end, ts_column="start_ts")
+        df = self._query("SELECT tool, start_ts AS start, lot_id, status, panels, processing_time_sec, uph, downtime_sec FROM jobs"
+                         + (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY start_ts", params)
+        df['start'] = pd.to_datetime(df['start'], unit='us')
+        return df
+
+    def trace_panel(self, panel_id: str) -> list:
+        """Every stored IDRead of a panel, oldest first: tool, log, lot, slot, IDRead and LoadedToTool times and the AlarmIDs in between."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT p.tool, f.name, p.lot_id, p.slot_id, p.id_read_ts, p.loaded_ts, p.alarm_ids FROM panels p "
+                "JOIN files f ON f.file_id = p.file_id WHERE p.panel_id = ? ORDER BY p.id_read_ts", (panel_id,)).fetchall()
+        return [{"tool": tool, "log": name, "lot_id": lot_id, "slot": slot, "id_read": _from_micros(id_read),
+                 "loaded_to_tool": _from_micros(loaded), "alarm_ids": [int(a) for a in alarm_ids.split(",") if a]}
+                for tool, name, lot_id, slot, id_read, loaded, alarm_ids in rows]
+
+    def search_panels(self, prefix: str, limit: int = 20) -> list:
+        """Distinct stored panel IDs starting with prefix (an index range scan)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT panel_id FROM panels WHERE panel_id >= ? AND panel_id < ? ORDER BY panel_id LIMIT ?",
+                                (prefix, prefix + "\U0010ffff", limit)).fetchall()
+        return [row[0] for row in rows]
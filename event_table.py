@@ -0,0 +1,141 @@
+# event_table.py
+"""
+Builds the typed event DataFrame straight from the parser's event stream.
+Each field is appended to its own column buffer, so no intermediate list of
+nested dicts or json_normalize pass is needed.
+"""
+import multiprocessing
+import os
+import numpy as np
+import pandas as pd
+import profiling
+from config import PARALLEL_PARSE_MIN_BYTES, PARSE_WORKERS, TIMESTAMP_FORMAT
+from code_tables import get_tables
+from log_parser import iter_input_events, iter_log_events_mmap
+from compressed_input import is_compressed_path
+from parallel_parser import map_chunks, split_ranges, worker_count
+
+INT_COLUMNS = ['details.DATAID', 'details.CEID', 'details.RPTID', 'details.AlarmID', 'details.PanelCount']
+CATEGORY_COLUMNS = ['msg_name', 'EventName', 'details.LotID', 'AlarmDescription']
+
+def parse_timestamps(values) -> pd.Series:
+    # Fast path for the fixed header format; anything unexpected falls back to per-value inference.
+    try: return pd.Series(pd.to_datetime(values, format=TIMESTAMP_FORMAT, cache=False))
+    except (ValueError, TypeError): return pd.Series(pd.to_datetime(values, format='mixed', errors='coerce'))
+
+class EventColumns:
+    """Per-field column buffers; chunks parsed separately can be merged in order with extend()."""
+    def __init__(self):
+        self.timestamps, self.msg_names = [], []
+        self.columns = {}
+        self.size = 0
+
+    def append(self, event: dict):
+        self.timestamps.append(event['timestamp'])
+        self.msg_names.append(event['msg_name'])
+        n = self.size
+        for key, value in event.get('details', {}).items():
+            name = 'details.' + key
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = [None] * n
+            column.append(value)
+        self.size = n = n + 1
+        for column in self.columns.values():
+            if len(column) < n: column.append(None)
+
+    def extend(self, other: 'EventColumns'):
+        self.timestamps.extend(other.timestamps)
+        self.msg_names.extend(other.msg_names)
+        for name in other.columns:
+            if name not in self.columns: self.columns[name] = [None] * self.size
+        for name, column in self.columns.items():
+            column.extend(other.columns.get(name) or [None] * other.size)
+        self.size += other.size
+
+    def to_raw_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame({'timestamp': parse_timestamps(self.timestamps), 'msg_name': self.msg_names})
+        for name, values in self.columns.items():
+            if name in INT_COLUMNS: df[name] = pd.to_numeric(pd.Series(values, dtype='object'), errors='coerce').astype('Int64')
+            else: df[name] = pd.Series(values, dtype='object')
+        return df
+
+    def to_frame(self) -> pd.DataFrame:
+        with profiling.stage("frame", self.size): df = self.to_raw_frame()
+        with profiling.stage("event_names", self.size): return add_event_names(df)
+
+def collect_columns(events) -> EventColumns:
+    columns = EventColumns()
+    with profiling.stage("parse") as stage:
+        for event in events: columns.append(event)
+        stage.rows = columns.size
+    return columns
+
+def build_event_frame(events) -> pd.DataFrame:
+    return collect_columns(events).to_frame()
+
+def event_name(details: dict) -> str:
+    # Same rule as add_event_names, for a single parsed event.
+    return get_tables().event_name(details.get('CEID')) or details.get('RCMD') or "Unknown"
+
+def add_event_names(df: pd.DataFrame) -> pd.DataFrame:
+    # Both columns are single fancy-indexing lookups into the compiled code tables.
+    tables = get_tables()
+    ceids = df['details.CEID'] if 'details.CEID' in df.columns else np.full(len(df), np.nan)
+    df['EventName'] = tables.event_names(ceids, df.get('details.RCMD'))
+
+    if 'details.AlarmID' in df.columns:
+        df['AlarmDescription'] = tables.alarm_descriptions(df['details.AlarmID'])
+
+    for name in CATEGORY_COLUMNS:
+        if name in df.columns: df[name] = df[name].astype('category')
+    return df
+
+def parse_log_frame(binary_stream, member: str = None) -> pd.DataFrame:
+    return build_event_frame(iter_input_events(binary_stream, member))
+
+def _parse_range_frame(path: str, start: int, end: int) -> pd.DataFrame:
+    # Runs in a worker. Text columns go back as categoricals (integer codes plus each distinct value
+    # once), which pickle far smaller and faster than the per-row Python lists of EventColumns.
+    df = collect_columns(iter_log_events_mmap(path, start, end)).to_raw_frame()
+    for name in df.columns:
+        if df[name].dtype == object: df[name] = df[name].astype('category')
+    return df
+
+def _concat_raw_frames(frames: list) -> pd.DataFrame:
+    """Chunk frames as one raw frame, typed exactly as to_raw_frame types a single pass."""
+    columns = {}
+    # First appearance order over the chunks is the serial parser's column order.
+    for name in dict.fromkeys(name for frame in frames for name in frame.columns):
+        if name == 'timestamp':
+            columns[name] = pd.concat([frame[name] for frame in frames], ignore_index=True)
+        elif name in INT_COLUMNS:
+            columns[name] = pd.concat([frame[name] if name in frame else pd.Series(pd.NA, index=frame.index, dtype='Int64')
+                                       for frame in frames], ignore_index=True)
+        else:
+            columns[name] = pd.Series(np.concatenate([frame[name].to_numpy(dtype=object, na_value=None) if name in frame
+                                                      else np.full(len(frame), None, dtype=object) for frame in frames]), dtype='object')
+    return pd.DataFrame(columns)
+
+def parse_log_frame_parallel(path: str, workers: int = None) -> pd.DataFrame:
+    """The same frame as parse_log_path_frame for a plain local log, parsed in chunks on up to `workers` cores."""
+    ranges = split_ranges(path, workers)
+    if len(ranges) == 1: return build_event_frame(iter_log_events_mmap(path))
+    with profiling.stage("parse_parallel") as stage:
+        frames = map_chunks(path, _parse_range_frame, ranges, workers)
+        stage.rows = sum(len(frame) for frame in frames)
+    with profiling.stage("frame", stage.rows): df = _concat_raw_frames(frames)
+    with profiling.stage("event_names", len(df)): return add_event_names(df)
+
+def _use_parallel_parse(path: str) -> bool:
+    # Only the main process fans out: batch and service workers already run one log per core
+    # (and batch workers are daemonic, so they cannot start processes of their own).
+    return (worker_count(PARSE_WORKERS) > 1 and multiprocessing.parent_process() is None
+            and os.path.getsize(path) >= PARALLEL_PARSE_MIN_BYTES)
+
+def parse_log_path_frame(path: str) -> pd.DataFrame:
+    # Compressed files are decompressed as a stream; only plain text can be memory-mapped or split.
+    if is_compressed_path(path):
+        with open(path, 'rb') as f: return parse_log_frame(f)
+    if _use_parallel_parse(path): return parse_log_frame_parallel(path, PARSE_WORKERS)
+    return build_event_frame(iter_log_events_mmap(path))
@@ -0,0 +1,174 @@
+# log_follower.py
+"""
+Follow mode for a log file that is still being written.
+LogFollower keeps a byte-offset checkpoint and only parses newly appended,
+complete blocks; IncrementalAnalysis folds each new event into running KPIs
+using the same rules as analyzer.analyze_data.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from collections import Counter
+from config import TIMESTAMP_FORMAT
+from code_tables import get_tables
+from log_parser import CHUNK_SIZE, LogEventParser, _decode_line
+from event_table import event_name
+from analyzer import stoppable_alarm_codes
+
+class LogFollower:
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.offset = 0  # end of the last fully consumed line at which no block was open
+        self._file = None
+
+    def close(self):
+        if self._file: self._file.close()
+        self._file = None
+
+    def _open(self):
+        self.close()
+        self._file = open(self.path, 'rb')
+        self.offset = 0
+
+    def _rotated(self) -> bool:
+        try: on_disk = os.stat(self.path)
+        except FileNotFoundError: return False
+        current = os.fstat(self._file.fileno())
+        return (on_disk.st_dev, on_disk.st_ino) != (current.st_dev, current.st_ino)
+
+    def poll(self):
+        """Yields events from complete blocks appended since the last checkpoint."""
+        if self._file is None:
+            if not os.path.exists(self.path): return
+            self._open()
+        if os.fstat(self._file.fileno()).st_size < self.offset:
+            self.offset = 0  # truncated in place (copytruncate rotation)
+        yield from self._read_new()
+        if self._rotated():
+            # Drain whatever the old file still had, then start on the new one from the top.
+            self._open()
+            yield from self._read_new()
+
+    def _read_new(self):
+        self._file.seek(self.offset)
+        parser = LogEventParser()
+        position, remainder = self.offset, b""
+        while True:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk: break
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            for raw in lines:
+                position += len(raw) + 1
+                event = parser.feed(_decode_line(raw + b"\n"))
+                # A half-written trailing block is re-read on the next poll, so only advance when idle.
+                if parser.idle: self.offset = position
+                if event: yield event
+
+class IncrementalAnalysis:
+    def __init__(self):
+        self.stoppable_codes = stoppable_alarm_codes()
+        self.event_counts = Counter()
+        self.last_time = None
+        self.open_alarms = []  # (alarm_time, alarm_id) waiting for the next non-'Alarm Set' event
+        self.downtime_incidents = []
+        self.total_downtime = 0.0
+        self.first_load_started = None
+        self.last_load_completed = None
+        self.last_loaded = None
+        self.cycle_times = []
+        self.lot_id = None
+        self.current_lot = None
+        self.lot_to_panel_map = {}
+        self.panel_slot_map = {}
+
+    def update(self, event: dict):
+        details = event['details']
+        name = event_name(details)
+        timestamp = datetime.strptime(event['timestamp'], TIMESTAMP_FORMAT)
+        self.event_counts[name] += 1
+        self.last_time = timestamp
+
+        if self.open_alarms and name != 'Alarm Set':
+            for alarm_time, alarm_id in self.open_alarms: self._close_alarm(alarm_time, alarm_id, timestamp)
+            self.open_alarms = []
+        alarm_id = _to_int(details.get('AlarmID'))
+        if alarm_id in self.stoppable_codes: self.open_alarms.append((timestamp, alarm_id))
+
+        if name == 'LoadStarted' and self.first_load_started is None: self.first_load_started = timestamp
+        elif name == 'LoadToToolCompleted': self.last_load_completed = timestamp
+        elif name == 'LoadedToTool':
+            start = self.last_loaded if self.last_loaded is not None else self.first_load_started
+            if start is not None: self.cycle_times.append((timestamp - start).total_seconds())
+            self.last_loaded = timestamp
+        elif name == 'LOADSTART':
+            if self.lot_id is None: self.lot_id = details.get('LotID', "N/A")
+            if details.get('LotID') is not None: self.current_lot = details['LotID']
+        elif name == 'IDRead':
+            panel_id = details.get('PanelID')
+            if panel_id is not None and details.get('SlotID') is not None:
+                self.panel_slot_map.setdefault(panel_id, details['SlotID'])
+            if panel_id is not None and self.current_lot is not None:
+                panels = self.lot_to_panel_map.setdefault(self.current_lot, [])
+                if panel_id not in panels: panels.append(panel_id)
+
+    def _close_alarm(self, alarm_time, alarm_id, recovery_time):
+        duration = (recovery_time - alarm_time).total_seconds()
+        if duration <= 0: return
+        self.total_downtime += duration
+        self.downtime_incidents.append({
+            'Alarm Time': alarm_time.strftime("%H:%M:%S"),
+            'Alarm Description': get_tables().alarm_db[alarm_id].get('description', 'Unknown'),
+            'Recovery Time': recovery_time.strftime("%H:%M:%S"),
+            'Downtime (sec)': round(duration, 2)
+        })
+
+    def snapshot(self) -> dict:
+        # Alarms still open are counted up to the latest event, as analyze_data does at end of log.
+        open_downtime = sum(max((self.last_time - t).total_seconds(), 0.0) for t, _ in self.open_alarms)
+        processing_time = 0.0
+        if self.first_load_started is not None and self.last_load_completed is not None:
+            processing_time = (self.last_load_completed - self.first_load_started).total_seconds()
+        panel_count = len(self.panel_slot_map) if self.lot_id is not None else 0
+        return {
+            "job_status": "No Job Found" if self.lot_id is None else ("Completed" if self.last_load_completed else "Did not complete"),
+            "lot_id": self.lot_id or "N/A", "panel_count": panel_count,
+            "total_processing_time_sec": processing_time,
+            "uph": (panel_count / processing_time * 3600) if processing_time > 0 else 0,
+            "total_downtime_sec": round(self.total_downtime + open_downtime, 2),
+            "open_alarms": len(self.open_alarms),
+            "alarms_with_context": list(self.downtime_incidents),
+            "cycle_times": list(self.cycle_times),
+            "event_counts": dict(self.event_counts),
+            "lot_to_panel_map": {lot: list(panels) for lot, panels in self.lot_to_panel_map.items()},
+            "panel_slot_map": dict(self.panel_slot_map),
+        }
+
+def _to_int(value):
+    try: return int(value)
+    except (TypeError, ValueError): return None
+
+def follow(path: str, interval: float = 5.0):
+    follower, analysis = LogFollower(path), IncrementalAnalysis()
+    try:
+        while True:
+            for event in follower.poll(): analysis.update(event)
+            yield analysis.snapshot()
+            time.sleep(interval)
+    finally:
+        follower.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow a growing Hirata log and print live KPIs.")
+    parser.add_argument("path")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls")
+    args = parser.parse_args()
+    keys = ["job_status", "lot_id", "panel_count", "uph", "total_downtime_sec", "open_alarms"]
+    for snapshot in follow(args.path, args.interval):
+        print(json.dumps({k: snapshot[k] for k in keys}), flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# log_generator.py
+"""
+Synthetic Hirata SECS/GEM log generator for benchmarks and large test inputs.
+
+    python log_generator.py synthetic.log --size 100MB --panels 25 --alarm-rate 0.02
+
+Each job is an S2F49 LOADSTART followed by docking, mapping and per-panel
+S6F11 reports (UnloadedFromMag, IDRead, LoadStarted, LoadedToTool). The CEIDs
+and RPTIDs in CEID_REPORTS are checked against CEID_MAP and RPTID_MAP at import,
+and payloads are shaped by RPTID_MAP. Alarms are drawn from ALARM_DB, with
+heartbeat/info noise in between.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from config import ALARM_DB, CEID_MAP, RPTID_MAP
+
+# Report sent with each CEID; CEIDs not listed carry an empty report list.
+CEID_REPORTS = {
+    7: 8, 12: 11, 13: 11, 16: 16, 30: 32, 101: 101, 102: 101, 120: 120, 121: 121,
+    141: 141, 151: 151, 181: 151, 182: 150, 183: 152,
+}
+# Fail at import rather than emit CEIDs/RPTIDs the parser cannot name.
+_unknown = sorted({f"CEID {c}" for c in CEID_REPORTS if c not in CEID_MAP} | {f"RPTID {r}" for r in CEID_REPORTS.values() if r not in RPTID_MAP})
+if _unknown: raise ValueError(f"CEID_REPORTS uses codes missing from config: {', '.join(_unknown)}")
+SIZE_UNITS = {"KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit): return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+def _item(value, indent: str) -> str:
+    if isinstance(value, int): return f"{indent}<U4 [1] {value}>\n"
+    return f"{indent}<A [{len(value)}] '{value}'>\n"
+
+def _list(items: list, indent: str) -> str:
+    inner = indent + "  "
+    body = "".join(_list(v, inner) if isinstance(v, list) else _item(v, inner) for v in items)
+    return f"{indent}<L [{len(items)}]\n{body}{indent}>\n"
+
+class LogGenerator:
+    def __init__(self, panels_per_lot: int = 25, alarm_rate: float = 0.02, noise_lines: int = 2, seed: int = 0,
+                 start: datetime = datetime(2024, 1, 1, 6, 0, 0)):
+        self.panels_per_lot = panels_per_lot
+        self.alarm_rate = alarm_rate
+        self.noise_lines = noise_lines
+        self.random = random.Random(seed)
+        self.now = start
+        self.data_id = 0
+        self.lot_number = 0
+        self.alarm_ids = sorted(ALARM_DB)
+
+    def _tick(self, low: float = 0.05, high: float = 2.0) -> str:
+        self.now += timedelta(seconds=self.random.uniform(low, high))
+        return self.now.strftime("%Y/%m/%d %H:%M:%S.%f")[:-3]
+
+    def _message(self, direction: str, msg_name: str, body: str) -> str:
+        self.data_id += 1
+        return f"{self._tick()},[Core:{direction}],MessageName={msg_name} SystemBytes={self.data_id}\n{body}.\n"
+
+    def _noise(self) -> str:
+        lines = []
+        for _ in range(self.random.randint(0, self.noise_lines * 2)):
+            kind = self.random.random()
+            if kind < 0.5:
+                lines.append(f"{self._tick(0.0, 0.2)},[Info],Equipment heartbeat ok seq={self.data_id}\n")
+            elif kind < 0.8:
+                lines.append(self._message("Send", "S1F1", "<L [0]\n>\n"))
+            else:
+                lines.append(self._message("Receive", "S6F12", "<B [1] 0x00>\n"))
+        return "".join(lines)
+
+    def event(self, ceid: int, values: list = None) -> str:
+        rptid = CEID_REPORTS.get(ceid)
+        reports = [[rptid, values or [""] * len(RPTID_MAP[rptid])]] if rptid else []
+        return self._message("Send", "S6F11", _list([self.data_id + 1, ceid, reports], "")) + self._noise()
+
+    def alarm(self) -> str:
+        alarm_id = self.random.choice(self.alarm_ids)
+        clock = self.now.strftime("%Y%m%d%H%M%S") + "00"
+        text = self.event(102, [clock, alarm_id])
+        if alarm_id == 18: text += self.event(18)
+        self.now += timedelta(seconds=self.random.expovariate(1 / 60))
+        return text + self.event(101, [clock, alarm_id])
+
+    def job(self) -> str:
+        self.lot_number += 1
+        lot_id = f"LOT{self.lot_number:06d}"
+        panels = [f"{lot_id}-P{i:03d}" for i in range(1, self.panels_per_lot + 1)]
+        magazine_id, port_id = f"MAG{self.lot_number % 50:03d}", str(self.random.randint(1, 2))
+        command = [0, "", "LOADSTART", [["LOTID", lot_id], ["LOTPANELS", panels]]]
+        parts = [self._message("Receive", "S2F49", _list(command, "")), self._message("Send", "S2F50", "<L [0]\n>\n")]
+        parts.append(self.event(13, ["REMOTE"]))
+        parts.append(self.event(180))
+        parts.append(self.event(181, [port_id, magazine_id, f"OP{self.random.randint(1, 20):02d}"]))
+        parts.append(self.event(185))
+        parts.append(self.event(136))
+        for slot, panel_id in enumerate(panels, start=1):
+            parts.append(self.event(121, [lot_id, panel_id, port_id]))
+            parts.append(self.event(120, [lot_id, panel_id, "0", "0", str(slot)]))
+            if self.random.random() < self.alarm_rate: parts.append(self.alarm())
+            # LoadStarted opens the processing time and the first cycle of the KPIs.
+            parts.append(self.event(130))
+            parts.append(self.event(127))
+        parts.append(self.event(131))
+        parts.append(self.event(182, [magazine_id]))
+        return "".join(parts)
+
+    def write(self, out, target_bytes: int) -> int:
+        written = 0
+        while written < target_bytes:
+            text = self.job()
+            out.write(text)
+            written += len(text)
+        return written
+
+def write_log(path: str, target_bytes: int, **options) -> int:
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        return LogGenerator(**options).write(f, target_bytes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Hirata SECS/GEM log.")
+    parser.add_argument("path")
+    parser.add_argument("--size", default="10MB", help="approximate output size, e.g. 10MB or 1GB")
+    parser.add_argument("--panels", type=int, default=25, help="panels per lot")
+    parser.add_argument("--alarm-rate", type=float, default=0.02, help="chance of an alarm per panel")
+    parser.add_argument("--noise", type=int, default=2, help="average noise lines between messages")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    written = write_log(args.path, parse_size(args.size), panels_per_lot=args.panels,
+                        alarm_rate=args.alarm_rate, noise_lines=args.noise, seed=args.seed)
+    print(f"wrote {written:,} bytes to {args.path}")
+
+if __name__ == "__main__":
+    main()
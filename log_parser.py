@@ -1,59 +1,44 @@
 # log_parser.py
+import mmap
+import os
 import re
-from io import StringIO
-from config import CEID_MAP, RPTID_MAP
+from code_tables import get_tables
+from compressed_input import iter_log_streams, list_log_members
+import profiling
+from sml import parse_sml, is_list, iter_nodes, scalar_values
+
+# Bump whenever parser output changes so cached results are invalidated.
+PARSER_VERSION = "3"
+
+_RCMD_RE = re.compile(r"[A-Z_]{5,}")
 
 def _parse_s6f11_report(full_text: str) -> dict:
     data = {}
-    tokens = re.findall(r"<(?:A|U\d|B)\s\[\d+\]\s(?:'([^']*)'|(\d+))>", full_text)
-    flat_values = [s if s else i for s, i in tokens]
-    
-    if len(flat_values) < 2: return {}
+    body = parse_sml(full_text)
+    # S6F11 body: <L [3] DATAID CEID <L [n] <L [2] RPTID <L [m] values...>>...>>
+    items = body[1] if is_list(body) else []
+    if len(items) < 2 or is_list(items[0]) or is_list(items[1]): return {}
     try:
-        data['DATAID'], data['CEID'] = int(flat_values[0]), int(flat_values[1])
-    except (ValueError, IndexError): return {}
+        data['DATAID'], data['CEID'] = int(items[0][1]), int(items[1][1])
+    except ValueError: return {}
 
-    if "Alarm" in CEID_MAP.get(data['CEID'], ''): data['AlarmID'] = data['CEID']
-    
-    # --- THIS IS THE FIX ---
-    # More robust parsing logic that does not assume fixed nesting.
-    try:
-        # Split the full text into lines to analyze structure
-        lines = [line.strip() for line in full_text.split('\n') if line.strip()]
-        rptid_index = -1
-        
-        # Find the line that contains the RPTID
-        for i, line in enumerate(lines):
-            match = re.search(r"<U\d\s\[1\]\s(\d+)>", line)
-            if match and int(match.group(1)) in RPTID_MAP:
-                rptid_index = i
-                break
-
-        if rptid_index != -1:
-            # Re-extract tokens starting from the line containing the RPTID
-            rptid_block_text = "\n".join(lines[rptid_index:])
-            rptid_tokens = re.findall(r"<(?:A|U\d|B)\s\[\d+\]\s(?:'([^']*)'|(\d+))>", rptid_block_text)
-            rptid_flat_values = [s if s else i for s, i in rptid_tokens]
-
-            rptid = int(rptid_flat_values[0])
-            data['RPTID'] = rptid
-            
-            # The data payload is everything after the RPTID
-            data_payload = rptid_flat_values[1:]
-            
-            # Filter out timestamps, but KEEP empty strings as they are valid placeholders
-            data_payload_filtered = [val for val in data_payload if not (len(val) >= 14 and val.isdigit())]
-
-            for i, name in enumerate(RPTID_MAP.get(rptid, [])):
-                if i < len(data_payload_filtered):
-                    data[name] = data_payload_filtered[i]
-            
-            if rptid == 101 and data.get('AlarmID') is None and len(data_payload_filtered) > 0:
-                data['AlarmID'] = data_payload_filtered[0]
-
-    except (StopIteration, ValueError, IndexError):
-        pass 
-    # --- END FIX ---
+    tables = get_tables()
+    if data['CEID'] in tables.alarm_ceids: data['AlarmID'] = data['CEID']
+
+    reports = items[2][1] if len(items) > 2 and is_list(items[2]) else []
+    for report in reports:
+        if not is_list(report) or not report[1] or is_list(report[1][0]): continue
+        try: rptid = int(report[1][0][1])
+        except ValueError: continue
+        if rptid not in tables.rptid_map: continue
+        data.setdefault('RPTID', rptid)
+        # Filter out timestamps, but KEEP empty strings as they are valid placeholders
+        payload = [v for child in report[1][1:] for v in scalar_values(child) if not (len(v) >= 14 and v.isdigit())]
+        # Report fields overwrite values taken from the CEID (e.g. AlarmID); only the RPTID keeps the first match.
+        for name, value in zip(tables.rptid_map[rptid], payload):
+            data[name] = value
+        if rptid == 101 and data.get('AlarmID') is None and payload:
+            data['AlarmID'] = payload[0]
 
     if data['CEID'] in [18, 113, 114]:
         data['AlarmID'] = data['CEID']
@@ -62,48 +47,197 @@ def _parse_s6f11_report(full_text: str) -> dict:
 
 def _parse_s2f49_command(full_text: str) -> dict:
     data = {}
-    rcmd_match = re.search(r"<\s*A\s*\[\d+\]\s*'([A-Z_]{5,})'", full_text)
-    if rcmd_match: data['RCMD'] = rcmd_match.group(1)
-    
-    tokens = re.findall(r"'([^']*)'", full_text)
-    try:
-        if 'LOTID' in tokens:
-            lotid_index = tokens.index('LOTID')
-            if lotid_index + 1 < len(tokens): data['LotID'] = tokens[lotid_index + 1]
-    except (ValueError, IndexError): pass
-
-    panels_match = re.search(r"'LOTPANELS'\s*>\s*<L\s\[(\d+)\]", full_text, re.IGNORECASE)
-    if panels_match: data['PanelCount'] = int(panels_match.group(1))
+    # Usually <L [4] DATAID OBJSPEC RCMD <L [n] <L [2] <A CPNAME> CPVAL>...>>, but the tree is walked in
+    # document order instead of indexed, so bodies with extra or reordered items keep their fields:
+    # RCMD is the first upper-case ASCII item, LotID the next ASCII item after 'LOTID', and
+    # PanelCount the size of the list right after 'LOTPANELS'.
+    previous, after_lotid = None, False
+    for fmt, value in iter_nodes(parse_sml(full_text)):
+        if fmt == 'L':
+            if previous == 'LOTPANELS' and 'PanelCount' not in data: data['PanelCount'] = len(value)
+        elif fmt == 'A':
+            if after_lotid and 'LotID' not in data: data['LotID'] = value
+            if 'RCMD' not in data and _RCMD_RE.fullmatch(value): data['RCMD'] = value
+            after_lotid = value == 'LOTID'
+        previous = value.upper() if fmt == 'A' else None
     return data
 
-def parse_log_file(uploaded_file):
-    events = []
-    if not uploaded_file: return events
-    try: lines = StringIO(uploaded_file.getvalue().decode("utf-8")).readlines()
-    except: lines = StringIO(uploaded_file.getvalue().decode("latin-1", errors='ignore')).readlines()
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        if not line: i+= 1; continue
-        header_match = re.match(r"(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}\.\d+),\[([^\]]+)\],(.*)", line)
-        if not header_match: i += 1; continue
+HEADER_RE = re.compile(r"(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}\.\d+),\[([^\]]+)\],(.*)")
+MSG_NAME_RE = re.compile(r"MessageName=(\w+)|Message=.*?:\'(\w+)\'")
+CHUNK_SIZE = 1 << 20
+
+def _decode_line(raw: bytes) -> str:
+    try: return raw.decode("utf-8")
+    except UnicodeDecodeError: return raw.decode("latin-1", errors='ignore')
+
+# Leading <L [n] <DATAID> <CEID> items of an S6F11-style body, read without parsing the rest.
+_LEADING_CEID_RE = re.compile(r"\s*<L\s*\[\d+\]\s*<\w+\s*\[\d+\][^>]*>\s*<\w+\s*\[\d+\]\s*(\d+)\s*>")
+
+class MessageParser:
+    """
+    A registered SECS message type: parse(body_text) -> details dict (empty to drop the block).
+    ceids, if given, is a pre-filter for S6F11-style bodies: blocks whose CEID is not listed are
+    dropped before the body is parsed.
+    """
+    def __init__(self, msg_name: str, parse, ceids=None):
+        self.msg_name, self.parse = msg_name, parse
+        self.ceids = frozenset(ceids) if ceids is not None else None
+        self.stage = "parse." + parse.__name__.strip('_')
+
+    def accepts(self, full_text: str) -> bool:
+        if self.ceids is None: return True
+        match = _LEADING_CEID_RE.match(full_text)
+        return match is not None and int(match.group(1)) in self.ceids
+
+# msg_name -> MessageParser. Blocks of any other message type are skipped without being buffered or decoded.
+MESSAGE_PARSERS = {}
+
+def register_message_parser(msg_name: str, parse, ceids=None) -> MessageParser:
+    """
+    Adds or replaces the parser for a message type, e.g.
+        register_message_parser('S5F1', parse_alarm_report)
+        register_message_parser('S6F11', _parse_s6f11_report, ceids=[101, 102])
+    Register before parsing starts; worker processes started with 'spawn' only see the default registry.
+    """
+    MESSAGE_PARSERS[msg_name] = spec = MessageParser(msg_name, parse, ceids)
+    return spec
+
+def unregister_message_parser(msg_name: str):
+    MESSAGE_PARSERS.pop(msg_name, None)
+
+def registry_fingerprint() -> str:
+    # Part of the analysis cache key, since the registry decides which events exist.
+    return ";".join(f"{name}:{spec.parse.__module__}.{spec.parse.__qualname__}:{sorted(spec.ceids) if spec.ceids is not None else '*'}"
+                    for name, spec in sorted(MESSAGE_PARSERS.items()))
+
+register_message_parser('S6F11', _parse_s6f11_report)
+register_message_parser('S2F49', _parse_s2f49_command)
+
+def _parse_block(timestamp: str, msg_name: str, block_lines: list):
+    if not block_lines: return None
+    return _parse_block_text(timestamp, msg_name, "".join(block_lines))
+
+def _parse_block_text(timestamp: str, msg_name: str, full_text: str):
+    spec = MESSAGE_PARSERS.get(msg_name)
+    if spec is None or not spec.accepts(full_text): return None
+    profiler = profiling.current()
+    if profiler is None: details = spec.parse(full_text)
+    else:
+        with profiler.stage(spec.stage): details = spec.parse(full_text)
+    if not details: return None
+    return {"timestamp": timestamp, "msg_name": msg_name, "details": details}
+
+class LogEventParser:
+    """Line-at-a-time state machine behind iter_log_events; feed() returns an event when a block closes."""
+    def __init__(self):
+        self.pending = None  # (timestamp, msg_name) of a Core:Send/Receive header waiting for its body
+        self.block = None    # (timestamp, msg_name, lines) of the currently open block
+        self.skipping = False  # the open block is an unregistered message type; its lines are not kept
+
+    @property
+    def idle(self) -> bool:
+        return self.pending is None and self.block is None
+
+    def feed(self, raw_line: str):
+        line = raw_line.strip()
+        if self.block is not None:
+            if line == '.':
+                block, self.block, self.skipping = self.block, None, False
+                return _parse_block(*block)
+            if not self.skipping: self.block[2].append(raw_line)
+            return None
+        if self.pending is not None:
+            header, self.pending = self.pending, None
+            if line.startswith('<'):
+                self.skipping = header[1] not in MESSAGE_PARSERS
+                self.block = (header[0], header[1], None if self.skipping else [raw_line])
+                return None
+        if not line: return None
+        header_match = HEADER_RE.match(line)
+        if not header_match: return None
         timestamp, log_type, message_part = header_match.groups()
-        msg_match = re.search(r"MessageName=(\w+)|Message=.*?:\'(\w+)\'", message_part)
+        msg_match = MSG_NAME_RE.search(message_part)
         msg_name = (msg_match.group(1) or msg_match.group(2)) if msg_match else "N/A"
-        event = {"timestamp": timestamp, "msg_name": msg_name}
-        if ("Core:Send" in log_type or "Core:Receive" in log_type) and i + 1 < len(lines) and lines[i+1].strip().startswith('<'):
-            j = i + 1; block_lines = []
-            while j < len(lines) and lines[j].strip() != '.':
-                block_lines.append(lines[j]); j += 1
-            i = j
-            if block_lines:
-                full_text = "".join(block_lines)
-                details = {}
-                if msg_name == 'S6F11': details = _parse_s6f11_report(full_text)
-                elif msg_name == 'S2F49': details = _parse_s2f49_command(full_text)
-                if details: event['details'] = details
-        if 'details' in event and event['details']:
-            events.append(event)
-        i += 1
-    return events
+        if "Core:Send" in log_type or "Core:Receive" in log_type:
+            self.pending = (timestamp, msg_name)
+            profiler = profiling.current()
+            if profiler is not None: profiler.count_message(msg_name)
+        return None
+
+    def finish(self):
+        # An unterminated block at end of input is still parsed.
+        block, self.block, self.pending, self.skipping = self.block, None, None, False
+        return _parse_block(*block) if block is not None else None
+
+def iter_log_events(binary_stream, chunk_size: int = CHUNK_SIZE):
+    """Yields parsed events one at a time; only the SECS block being read is held in memory."""
+    if not binary_stream: return
+    if hasattr(binary_stream, 'seekable') and binary_stream.seekable(): binary_stream.seek(0)
+    parser = LogEventParser()
+    remainder = b""
+    while True:
+        chunk = binary_stream.read(chunk_size)
+        if not chunk: break
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for raw in lines:
+            # Body lines of an unregistered message are stepped over as bytes until its '.' terminator.
+            if parser.skipping and raw.strip() != b".": continue
+            event = parser.feed(_decode_line(raw + b"\n"))
+            if event: yield event
+    if remainder and not (parser.skipping and remainder.strip() != b"."):
+        event = parser.feed(_decode_line(remainder))
+        if event: yield event
+    event = parser.finish()
+    if event: yield event
+
+def iter_input_events(binary_stream, member: str = None, chunk_size: int = CHUNK_SIZE):
+    """
+    iter_log_events for plain or compressed input. An archive holding several logs needs `member`:
+    separate logs are never analyzed as one, since jobs and downtime would run across them.
+    """
+    if not binary_stream: return
+    if member is None:
+        members = list_log_members(binary_stream)
+        if len(members) > 1: raise ValueError(f"archive holds {len(members)} logs, pick one with member=: {', '.join(members)}")
+    for name, stream in iter_log_streams(binary_stream):
+        if member is None or name == member: yield from iter_log_events(stream, chunk_size)
+
+def parse_log_file(uploaded_file):
+    if not uploaded_file: return []
+    return list(iter_input_events(uploaded_file))
+
+# --- Bytes-level scanning of local files ---
+# Only Core:Send/Receive headers are matched; every other line is skipped inside the regex engine.
+CORE_HEADER_BYTES_RE = re.compile(
+    rb"^[ \t\r\f\v]*(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}\.\d+),\[([^\]\n]*Core:(?:Send|Receive)[^\]\n]*)\],([^\n]*)", re.M)
+MSG_NAME_BYTES_RE = re.compile(rb"MessageName=(\w+)|Message=.*?:\'(\w+)\'")
+BLOCK_START_BYTES_RE = re.compile(rb"[ \t\r\f\v]*<")
+TERMINATOR_BYTES_RE = re.compile(rb"\n[ \t\r\f\v]*\.[ \t\r\f\v]*(?:\n|\Z)")
+
+def _decode_block(raw: bytes) -> str:
+    try: return raw.decode("utf-8")
+    except UnicodeDecodeError: return "".join(_decode_line(line) for line in raw.splitlines(keepends=True))
+
+def iter_log_events_mmap(path: str, start: int = 0, end: int = None):
+    """Like iter_log_events for a local file, but scans the memory-mapped bytes and decodes only registered message blocks."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0: return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm) if end is None else end
+            position = start
+            profiler = profiling.current()
+            while position < end:
+                header = CORE_HEADER_BYTES_RE.search(mm, position, end)
+                if not header: break
+                position = header.end() + 1
+                if position >= end or not BLOCK_START_BYTES_RE.match(mm, position, end): continue
+                terminator = TERMINATOR_BYTES_RE.search(mm, position, end)
+                block_end = terminator.start() + 1 if terminator else end
+                msg_match = MSG_NAME_BYTES_RE.search(header.group(3))
+                msg_name = (msg_match.group(1) or msg_match.group(2)).decode("ascii") if msg_match else "N/A"
+                if profiler is not None: profiler.count_message(msg_name)
+                if msg_name in MESSAGE_PARSERS:
+                    event = _parse_block_text(header.group(1).decode("ascii"), msg_name, _decode_block(mm[position:block_end]))
+                    if event: yield event
+                position = terminator.end() if terminator else end
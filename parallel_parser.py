@@ -0,0 +1,44 @@
+# parallel_parser.py
+"""
+Splits one large local log into chunks that are parsed on several cores.
+The file is cut only right after a '.' terminator line: the serial parser is
+always idle there, so every chunk parses exactly as it would in one pass.
+Chunk results come back in file order, which is the serial parser's order
+(event_table.parse_log_frame_parallel merges them into one frame).
+"""
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# A line that is just the '.' block terminator (allowing surrounding blanks).
+_TERMINATOR_LINE_RE = re.compile(rb"\n[ \t\r]*\.[ \t\r]*\n")
+MIN_CHUNK_BYTES = 8 << 20
+
+def find_split_points(path: str, parts: int) -> list:
+    size = os.path.getsize(path)
+    if parts <= 1 or size == 0: return [0, size]
+    points = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, parts):
+            target = max(size * i // parts - 1, points[-1])
+            match = _TERMINATOR_LINE_RE.search(mm, target)
+            if not match: break
+            if match.end() > points[-1] and match.end() < size: points.append(match.end())
+    points.append(size)
+    return points
+
+def worker_count(workers: int = None) -> int:
+    # More processes than cores only adds start-up and transfer cost.
+    return max(1, min(workers or os.cpu_count() or 1, os.cpu_count() or 1))
+
+def split_ranges(path: str, workers: int = None, min_chunk_bytes: int = MIN_CHUNK_BYTES) -> list:
+    """(start, end) byte ranges, one per worker but none much smaller than min_chunk_bytes."""
+    parts = max(1, min(worker_count(workers), os.path.getsize(path) // max(min_chunk_bytes, 1)))
+    points = find_split_points(path, parts)
+    return list(zip(points[:-1], points[1:]))
+
+def map_chunks(path: str, parse_range, ranges: list, workers: int = None) -> list:
+    """[parse_range(path, start, end) for each range] in file order; parse_range must be a module-level function."""
+    with ProcessPoolExecutor(max_workers=min(worker_count(workers), len(ranges))) as pool:
+        return list(pool.map(parse_range, [path] * len(ranges), *zip(*ranges)))
@@ -0,0 +1,28 @@
+# pipeline.py
+"""
+End-to-end parse -> index -> analysis run shared by the dashboard and the headless tools.
+"""
+import os
+import pandas as pd
+import profiling
+from event_table import parse_log_frame, parse_log_path_frame
+from event_index import EventIndex
+from analyzer import lazy_summary, lazy_eda
+
+def analyze_frame(df: pd.DataFrame) -> tuple:
+    # Summary and EDA sections are computed on first access, so callers only pay for what they read.
+    # Under an active profile they are all computed here, so every analyzer stage is timed inside it.
+    with profiling.stage("event_index", len(df)): index = EventIndex(df)
+    summary, eda_results = lazy_summary(df, index), lazy_eda(df, index)
+    if profiling.current() is not None:
+        with profiling.stage("analyze_data", len(df)): summary.compute_all()
+        with profiling.stage("perform_eda", len(df)): eda_results.compute_all()
+    return df, summary, eda_results
+
+def run_analysis(source, member: str = None) -> tuple:
+    # Plain-text local paths take the memory-mapped scanner; uploads, other streams and compressed files are read in chunks.
+    # member picks one log of a multi-log archive.
+    if member and isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f: return analyze_frame(parse_log_frame(f, member))
+    df = parse_log_path_frame(source) if isinstance(source, (str, os.PathLike)) else parse_log_frame(source, member)
+    return analyze_frame(df)
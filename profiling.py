@@ -0,0 +1,141 @@
+# profiling.py
+"""
+Opt-in stage timing for the parse/analysis pipeline.
+
+    with profiling.profile() as prof:
+        run_analysis(path)
+    prof.report()            # per-stage wall time, calls, rows and peak memory
+    prof.dump_json("perf.json")
+
+When no profile is active, stage() hands back a shared no-op context and
+timed() adds a single context-variable lookup per call.
+"""
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+try: import resource  # not available on Windows
+except ImportError: resource = None
+
+_current = contextvars.ContextVar("log_analyzer_profile", default=None)
+
+class _NullStage:
+    rows = None
+    def __setattr__(self, name, value): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_STAGE = _NullStage()
+
+def _max_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None
+
+class _Stage:
+    def __init__(self, profiler: 'Profiler', name: str, rows: int = None):
+        self.profiler, self.name, self.rows = profiler, name, rows
+        self.child_peak = 0
+
+    def __enter__(self):
+        self.profiler._entry(self.name, len(self.profiler._stack))
+        self.profiler._stack.append(self)
+        if self.profiler.trace_memory: tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        stack = self.profiler._stack
+        stack.pop()
+        peak = None
+        if self.profiler.trace_memory:
+            # reset_peak() in a nested stage hides earlier peaks, so nested stages hand theirs up.
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            if stack: stack[-1].child_peak = max(stack[-1].child_peak, peak)
+            peak /= 1 << 20
+        self.profiler.record(self.name, seconds, self.rows, peak, len(stack))
+        return False
+
+class Profiler:
+    def __init__(self, trace_memory: bool = False, use_cprofile: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.message_counts = {}
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        self._stack = []
+
+    def stage(self, name: str, rows: int = None) -> _Stage:
+        return _Stage(self, name, rows)
+
+    def _entry(self, name: str, depth: int) -> dict:
+        # Entries are created when a stage starts, so the report lists outer stages before nested ones.
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {"stage": name, "depth": depth, "calls": 0, "seconds": 0.0, "rows": None, "peak_mb": None}
+        return entry
+
+    def record(self, name: str, seconds: float, rows: int = None, peak_mb: float = None, depth: int = 0):
+        entry = self._entry(name, depth)
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        if rows is not None: entry["rows"] = (entry["rows"] or 0) + rows
+        if peak_mb is not None: entry["peak_mb"] = max(entry["peak_mb"] or 0.0, round(peak_mb, 2))
+
+    def count_message(self, msg_name: str):
+        self.message_counts[msg_name] = self.message_counts.get(msg_name, 0) + 1
+
+    def report(self) -> list:
+        return [dict(entry, seconds=round(entry["seconds"], 4)) for entry in self.stages.values()]
+
+    def to_dict(self) -> dict:
+        return {"stages": self.report(), "message_counts": dict(self.message_counts), "max_rss_mb": _max_rss_mb()}
+
+    def dump_json(self, path: str):
+        with open(path, 'w') as f: json.dump(self.to_dict(), f, indent=1)
+
+    def dump_cprofile(self, path: str):
+        if self.cprofile is None: raise RuntimeError("profile was started without use_cprofile=True")
+        self.cprofile.dump_stats(path)
+
+    def cprofile_summary(self, limit: int = 25) -> str:
+        if self.cprofile is None: return ""
+        out = io.StringIO()
+        pstats.Stats(self.cprofile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+@contextmanager
+def profile(trace_memory: bool = False, use_cprofile: bool = False):
+    profiler = Profiler(trace_memory, use_cprofile)
+    token = _current.set(profiler)
+    if trace_memory: tracemalloc.start()
+    if profiler.cprofile: profiler.cprofile.enable()
+    try:
+        yield profiler
+    finally:
+        if profiler.cprofile: profiler.cprofile.disable()
+        if trace_memory: tracemalloc.stop()
+        _current.reset(token)
+
+def current():
+    return _current.get()
+
+def stage(name: str, rows: int = None):
+    profiler = _current.get()
+    return profiler.stage(name, rows) if profiler is not None else _NULL_STAGE
+
+def timed(name: str):
+    """Decorator that records a stage per call; rows is the length of a DataFrame first argument."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _current.get()
+            if profiler is None: return func(*args, **kwargs)
+            rows = len(args[0]) if args and hasattr(args[0], 'columns') else None
+            with profiler.stage(name, rows):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
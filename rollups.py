@@ -0,0 +1,124 @@
+# rollups.py
+"""
+Time-bucketed rollup cubes (per minute, hour and shift) for trend and zoom views.
+
+All cubes come from one pass over the typed columns: timestamps become integer
+microseconds, EventName and alarm level become integer codes, and each cube is
+a handful of np.bincount calls over (bucket, code) pairs. Charts then read the
+small cube instead of the raw events.
+"""
+from functools import partial
+import numpy as np
+import pandas as pd
+import profiling
+from config import SHIFT_HOURS, SHIFT_START_HOUR
+from code_tables import LEVELS, get_tables
+from event_index import EventIndex
+from analyzer import LazySections, get_downtime_intervals
+
+HOUR_US = 3600 * 10**6
+# Bucket width and offset from the epoch, in microseconds.
+FREQUENCIES = {
+    "minute": (60 * 10**6, 0),
+    "hour": (HOUR_US, 0),
+    "shift": (SHIFT_HOURS * HOUR_US, (SHIFT_START_HOUR % SHIFT_HOURS) * HOUR_US),
+}
+# Spans with more buckets than this (e.g. a stray 1970 timestamp) keep only buckets that have events.
+MAX_DENSE_BUCKETS = 500_000
+ALARM_EVENTS = ('Alarm Set', 'AlarmSet')
+
+class RollupCube:
+    """
+    Aggregates for one bucket frequency.
+    event_counts: bucket start x EventName counts.
+    metrics: bucket start x [events, alarms.<level>..., panels_loaded, downtime_sec, uph].
+    """
+    def __init__(self, freq: str, width_sec: float, event_counts: pd.DataFrame, metrics: pd.DataFrame):
+        self.freq, self.width_sec = freq, width_sec
+        self.event_counts, self.metrics = event_counts, metrics
+
+    def __len__(self) -> int:
+        return len(self.metrics)
+
+    def window(self, start=None, end=None) -> 'RollupCube':
+        rows = slice(start, end)
+        return RollupCube(self.freq, self.width_sec, self.event_counts.loc[rows], self.metrics.loc[rows])
+
+def _downtime_before(edges: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    # Total downtime (us) before each edge: sum of min(edge, end) - start over intervals with start < edge,
+    # from prefix sums over the sorted starts and ends.
+    starts, ends = np.sort(starts), np.sort(ends)
+    start_sums = np.concatenate(([0], np.cumsum(starts)))
+    end_sums = np.concatenate(([0], np.cumsum(ends)))
+    n_started = np.searchsorted(starts, edges, side='left')
+    n_ended = np.searchsorted(ends, edges, side='left')
+    return (n_started * edges - start_sums[n_started]) - (n_ended * edges - end_sums[n_ended])
+
+def _cube(freq: str, times: np.ndarray, name_codes: np.ndarray, names: list, level_codes: np.ndarray,
+          loaded: np.ndarray, downtime: tuple) -> RollupCube:
+    width, offset = FREQUENCIES[freq]
+    raw = (times - offset) // width
+    first, last = (raw.min(), raw.max()) if len(raw) else (0, -1)
+    if last - first + 1 <= MAX_DENSE_BUCKETS:
+        buckets, codes = np.arange(first, last + 1), raw - first
+    else:
+        buckets, codes = np.unique(raw, return_inverse=True)
+    n = len(buckets)
+    starts_us = buckets * width + offset
+    index = pd.DatetimeIndex(starts_us.astype('datetime64[us]'), name='bucket')
+
+    counts = np.bincount(codes * len(names) + name_codes, minlength=n * len(names)).reshape(n, len(names))
+    metrics = pd.DataFrame({'events': np.bincount(codes, minlength=n)}, index=index)
+    alarm_rows = level_codes >= 0
+    by_level = np.bincount(codes[alarm_rows] * len(LEVELS) + level_codes[alarm_rows], minlength=n * len(LEVELS)).reshape(n, len(LEVELS))
+    for i, level in enumerate(LEVELS): metrics[f'alarms.{level}'] = by_level[:, i]
+    metrics['panels_loaded'] = np.bincount(codes[loaded], minlength=n)
+    alarm_times, recovery_times = downtime
+    edges = np.append(starts_us, starts_us[-1] + width) if n else np.empty(0, dtype=np.int64)
+    before = _downtime_before(edges, alarm_times, recovery_times) if len(alarm_times) else np.zeros(len(edges))
+    metrics['downtime_sec'] = np.diff(before) / 10**6 if n else np.empty(0)
+    metrics['uph'] = metrics['panels_loaded'] * (HOUR_US / width)
+    return RollupCube(freq, width / 10**6, pd.DataFrame(counts, index=index, columns=pd.Index(names, name='EventName')), metrics)
+
+def _rollup_columns(df: pd.DataFrame, index: EventIndex, sections) -> dict:
+    # The single pass over the event columns that every frequency's cube is binned from.
+    valid = df['timestamp'].notna().to_numpy() if 'timestamp' in df.columns else np.zeros(len(df), dtype=bool)
+    all_times = df['timestamp'].to_numpy(dtype='datetime64[us]').astype(np.int64) if 'timestamp' in df.columns else np.zeros(len(df), dtype=np.int64)
+
+    if 'EventName' in df.columns:
+        names = pd.Categorical(df['EventName'])
+        name_codes, categories = names.codes.astype(np.int64), list(names.categories)
+    else:
+        name_codes, categories = np.full(len(df), -1, dtype=np.int64), []
+    # Rows without an EventName are counted under "Unknown".
+    if (name_codes < 0).any():
+        if "Unknown" not in categories: categories.append("Unknown")
+        name_codes = np.where(name_codes < 0, categories.index("Unknown"), name_codes)
+
+    level_codes = np.full(len(df), -1, dtype=np.int64)
+    if 'details.AlarmID' in df.columns:
+        alarm_rows = index.positions(*ALARM_EVENTS)
+        alarm_rows = alarm_rows[df['details.AlarmID'].iloc[alarm_rows].notna().to_numpy()]
+        level_codes[alarm_rows] = get_tables().alarm_level_codes(df['details.AlarmID'].iloc[alarm_rows])
+    loaded = np.zeros(len(df), dtype=bool)
+    loaded[index.positions('LoadedToTool')] = True
+
+    # Downtime intervals follow the same alarm -> recovery rule as get_downtime_incidents.
+    alarm_positions, recovery_positions, durations = get_downtime_intervals(df, index)
+    keep = durations > 0
+    downtime = (all_times[alarm_positions[keep]], all_times[recovery_positions[keep]])
+    return {"times": all_times[valid], "name_codes": name_codes[valid], "names": categories,
+            "level_codes": level_codes[valid], "loaded": loaded[valid], "downtime": downtime}
+
+def _rollup(freq: str, df: pd.DataFrame, index: EventIndex, sections) -> RollupCube:
+    with profiling.stage("rollups." + freq, len(df)):
+        return _cube(freq, **sections.memo('columns', _rollup_columns))
+
+ROLLUP_SECTIONS = {freq: partial(_rollup, freq) for freq in FREQUENCIES}
+
+def lazy_rollups(df: pd.DataFrame, index: EventIndex = None) -> LazySections:
+    """{freq: RollupCube}, each cube binned on first access from one shared pass over the events."""
+    return LazySections(ROLLUP_SECTIONS, df, index)
+
+def build_rollups(df: pd.DataFrame, index: EventIndex = None) -> dict:
+    return dict(lazy_rollups(df, index))
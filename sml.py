@@ -0,0 +1,54 @@
+# sml.py
+"""
+Single-pass SECS-II (SML) body parser.
+A body is turned into nested (format, value) tuples: lists are ('L', [children]),
+items are e.g. ('A', 'LOT01') or ('U4', '120') with the value kept as text.
+"""
+import re
+
+# Possessive quantifiers keep the engine from backtracking (about 2x faster); Python before 3.11 lacks
+# them, so it gets the same pattern with plain quantifiers, which matches identically.
+# findall tuples avoid per-match method calls.
+try: _SML_TOKEN_RE = re.compile(r"<\s*+(\w++)\s*+\[\d++\]\s*+(?:'([^']*+)'|([^<>']*+))(>?)|>")
+except re.error: _SML_TOKEN_RE = re.compile(r"<\s*(\w+)\s*\[\d+\]\s*(?:'([^']*)'|([^<>']*))(>?)|>")
+
+def parse_sml(text: str, _findall=_SML_TOKEN_RE.findall):
+    root = []
+    stack = [root]
+    children = root
+    for fmt, quoted, bare, closed in _findall(text):
+        if fmt == 'L':
+            node = []
+            children.append(('L', node))
+            if not closed:
+                stack.append(node)
+                children = node
+        elif fmt:
+            # An unmatched group is '', so a quoted '' and an empty bare value both come out as ''.
+            children.append((fmt, quoted or bare.strip()))
+        elif len(stack) > 1:
+            # A bare '>' closes the innermost open list.
+            stack.pop()
+            children = stack[-1]
+    return root[0] if root else None
+
+def is_list(node) -> bool:
+    return node is not None and node[0] == 'L'
+
+def iter_nodes(node):
+    """Pre-order walk over a node and all of its descendants."""
+    if node is None: return
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        if current[0] == 'L': stack.extend(reversed(current[1]))
+
+def scalar_values(node) -> list:
+    """Item values under a node in document order."""
+    if node[0] != 'L': return [node[1]]
+    values = []
+    for child in node[1]:
+        if child[0] == 'L': values.extend(scalar_values(child))
+        else: values.append(child[1])
+    return values
@@ -0,0 +1,15 @@
+# test_code_tables.py
+import pandas as pd
+from code_tables import CodeTables
+from config import ALARM_DB, CEID_MAP, RPTID_MAP
+
+def test_large_ids_use_sorted_tables():
+    tables = CodeTables({**CEID_MAP, 4_000_000_000: "Alarm Big"}, RPTID_MAP,
+                        {**ALARM_DB, 3_000_000_000: {'description': 'Huge', 'level': 'Error'}})
+    assert isinstance(tables.ceid_codes, tuple)
+    ceids = pd.Series([102, 4_000_000_000, 999, None], dtype='Int64')
+    assert list(tables.event_names(ceids)) == ['Alarm Set', 'Alarm Big', 'Unknown', 'Unknown']
+    alarm_ids = pd.Series([17, 3_000_000_000, 5, None], dtype='Int64')
+    assert list(tables.alarm_descriptions(alarm_ids)) == ['<0190>Emergency stop', 'Huge', '', '']
+    assert list(tables.is_stoppable(alarm_ids)) == [True, True, False, False]
+    assert 3_000_000_000 in tables.stoppable_codes()
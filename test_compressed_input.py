@@ -0,0 +1,42 @@
+# test_compressed_input.py
+import gzip
+import io
+import zipfile
+import pytest
+from compressed_input import iter_log_streams, list_log_members
+from log_parser import iter_input_events
+
+LOG = b"""2024/01/01 10:00:00.000,[Core:Receive],MessageName=S6F11
+<L [3]
+  <U4 [1] 1>
+  <U4 [1] 120>
+  <L [0]
+  >
+>
+.
+"""
+
+def _zip(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items(): archive.writestr(name, data)
+    return buffer.getvalue()
+
+@pytest.fixture
+def nested_archive():
+    inner = _zip({"a.log": LOG, "b.log.gz": gzip.compress(LOG)})
+    return io.BytesIO(_zip({"inner.zip": inner, "top.log": LOG}))
+
+def test_nested_members_are_listed_as_streamed(nested_archive):
+    members = list_log_members(nested_archive)
+    assert members == ["inner.zip/a.log", "inner.zip/b.log.gz", "top.log"]
+    assert members == [name for name, _ in iter_log_streams(nested_archive)]
+
+def test_nested_logs_are_never_merged(nested_archive):
+    with pytest.raises(ValueError, match="holds 3 logs"): list(iter_input_events(nested_archive))
+    nested_archive.seek(0)
+    events = list(iter_input_events(nested_archive, member="inner.zip/b.log.gz"))
+    assert len(events) == len(list(iter_input_events(io.BytesIO(LOG))))
+
+def test_plain_input_has_no_members():
+    assert list_log_members(io.BytesIO(LOG)) == [None]
@@ -0,0 +1,71 @@
+# test_log_parser.py
+from log_parser import _parse_s2f49_command, _parse_s6f11_report
+
+ALARM_SET_REPORT = """<L [3]
+  <U4 [1] 5>
+  <U4 [1] 102>
+  <L [1]
+    <L [2]
+      <U4 [1] 101>
+      <L [2]
+        <A [19] '2024-01-01 10:00:00'>
+        <U4 [1] 611>
+      >
+    >
+  >
+>"""
+
+LOADSTART = """<L [4]
+  <U4 [1] 0>
+  <A [0] ''>
+  <A [9] 'LOADSTART'>
+  <L [2]
+    <L [2]
+      <A [5] 'LOTID'>
+      <A [4] 'LOT1'>
+    >
+    <L [2]
+      <A [9] 'LOTPANELS'>
+      <L [3]
+        <A [2] 'P1'>
+        <A [2] 'P2'>
+        <A [2] 'P3'>
+      >
+    >
+  >
+>"""
+
+# Five items, RCMD not third and the parameters nested one list deeper.
+LOADSTART_EXTRA_ITEMS = """<L [5]
+  <U4 [1] 0>
+  <A [0] ''>
+  <U4 [1] 7>
+  <A [9] 'LOADSTART'>
+  <L [1]
+    <L [2]
+      <L [2]
+        <A [5] 'LOTID'>
+        <A [4] 'LOT1'>
+      >
+      <L [2]
+        <A [9] 'LotPanels'>
+        <L [2]
+          <A [2] 'P1'>
+          <A [2] 'P2'>
+        >
+      >
+    >
+  >
+>"""
+
+def test_s6f11_report_fields_overwrite_ceid_values():
+    data = _parse_s6f11_report(ALARM_SET_REPORT)
+    assert data['CEID'] == 102 and data['RPTID'] == 101
+    assert data['AlarmID'] == '611'
+    assert data['Clock'] == '2024-01-01 10:00:00'
+
+def test_s2f49_canonical_layout():
+    assert _parse_s2f49_command(LOADSTART) == {'RCMD': 'LOADSTART', 'LotID': 'LOT1', 'PanelCount': 3}
+
+def test_s2f49_non_canonical_layout():
+    assert _parse_s2f49_command(LOADSTART_EXTRA_ITEMS) == {'RCMD': 'LOADSTART', 'LotID': 'LOT1', 'PanelCount': 2}